@@ -0,0 +1,118 @@
+from pdp_groupby import group_stats
+import pandas as pd
+import numpy as np
+import argparse
+import time
+
+# Value pools of the synthetic PDP frame
+states = ['CA', 'NY', 'TX', 'FL', 'WA', 'NH', 'OH', 'MI', 'MN', 'CO', 'MD', 'NC']
+pesticide_names = [
+    'Imidacloprid', 'Thiamethoxam', 'Clothianidin', 'Acetamiprid', 'Boscalid',
+    'Chlorpyrifos', 'Pyraclostrobin', 'Azoxystrobin', 'Carbendazim', 'Fludioxonil',
+]
+
+
+def make_pdp_frame(rows):
+    """
+    A synthetic frame shaped like load_pdp(columns=['State', 'PesticideName',
+    'Concentration']): categorical keys, float32 concentrations with about
+    2% NaN, and a few repeated values so ties are exercised.
+    """
+    rng = np.random.default_rng(0)
+    concentration = np.round(rng.gamma(1.0, 0.05, rows), 3).astype('float32')
+    concentration[rng.random(rows) < 0.02] = np.nan
+    return pd.DataFrame({
+        'State': pd.Categorical(rng.choice(states, rows)),
+        'PesticideName': pd.Categorical(np.asarray(pesticide_names)[rng.integers(0, len(pesticide_names), rows)]),
+        'Concentration': concentration,
+    })
+
+
+def concentration_groupbys(df):
+    """
+    The previous memory path of concentration_and_type.py: a median groupby,
+    a size groupby, an idxmax groupby and a merge.
+    """
+    df = df.dropna(subset=['Concentration'])
+    state_concentration = df.groupby('State', observed=True)['Concentration'].median().reset_index()
+    pesticide_counts = df.groupby(['State', 'PesticideName'], observed=True).size().reset_index(name='Counts')
+    idx = pesticide_counts.groupby('State', observed=True)['Counts'].idxmax()
+    most_common_pesticide = pesticide_counts.loc[idx].reset_index(drop=True)
+    return pd.merge(state_concentration, most_common_pesticide, on='State')
+
+
+def concentration_engine(df):
+    stats = group_stats(df, by='State', stats=['median', 'mode'], mode_column='PesticideName')
+    return stats.rename(columns={'median': 'Concentration', 'mode_PesticideName': 'PesticideName', 'mode_count': 'Counts'})
+
+
+def neonicotinoid_groupbys(df):
+    """
+    The previous memory path of neonicotinoid_max.py: an idxmax groupby and
+    a .loc gather.
+    """
+    df = df.dropna(subset=['Concentration'])
+    highest = df.loc[df.groupby('State', observed=True)['Concentration'].idxmax()]
+    return highest[['State', 'PesticideName', 'Concentration']].reset_index(drop=True)
+
+
+def neonicotinoid_engine(df):
+    stats = group_stats(df, by='State', stats=['max', 'argmax'], argmax_fields=['PesticideName'])
+    return stats.rename(columns={'max': 'Concentration', 'argmax_PesticideName': 'PesticideName'})
+
+
+def all_groupbys(df):
+    return concentration_groupbys(df).merge(neonicotinoid_groupbys(df), on='State', suffixes=('', 'Max'))
+
+
+def all_engine(df):
+    stats = group_stats(df, by='State', stats=['median', 'mode', 'max', 'argmax'],
+                        argmax_fields=['PesticideName'], mode_column='PesticideName')
+    return stats.rename(columns={
+        'median': 'Concentration', 'mode_PesticideName': 'PesticideName', 'mode_count': 'Counts',
+        'max': 'ConcentrationMax', 'argmax_PesticideName': 'PesticideNameMax',
+    })
+
+
+# (label, previous code, group_stats)
+variants = [
+    ('concentration_and_type', concentration_groupbys, concentration_engine),
+    ('neonicotinoid_max', neonicotinoid_groupbys, neonicotinoid_engine),
+    ('both summaries', all_groupbys, all_engine),
+]
+
+
+def best_time(function, df, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(df)
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the multi-groupby PDP summaries with the single-pass group_stats engine.'
+    )
+    parser.add_argument('--rows', type=int, default=10000000, help='Rows of the synthetic PDP frame.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant; the best time is reported.')
+    args = parser.parse_args()
+
+    print(f"Building a synthetic frame of {args.rows} PDP rows...")
+    df = make_pdp_frame(args.rows)
+
+    for label, previous, engine in variants:
+        groupby_seconds, expected = best_time(previous, df, args.repeat)
+        engine_seconds, result = best_time(engine, df, args.repeat)
+        # Compare as plain values, since the two paths may label categories differently
+        same = all(
+            np.array_equal(expected[column].astype(str).to_numpy(), result[column].astype(str).to_numpy())
+            for column in expected.columns
+        )
+        print(f"  {label:<24} groupbys {groupby_seconds:6.2f} s  group_stats {engine_seconds:6.2f} s  "
+              f"({groupby_seconds / engine_seconds:.1f}x)  {'same results' if same else 'RESULTS DIFFER'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+from replay_server import make_querylist_html
+from scraper import parsers
+import argparse
+import sys
+import time
+
+
+def benchmark(html, repeat):
+    """
+    Times every parser backend on one page and checks that they agree.
+
+    Returns a dict of backend name -> best time in seconds, and the row count.
+    """
+    reference = None
+    timings = {}
+    for name, parse in parsers.items():
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = parse(html)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        if reference is None:
+            reference = rows
+        elif rows != reference:
+            print(f"Error: the '{name}' backend produced different rows.")
+            sys.exit(1)
+        timings[name] = best
+    return timings, len(reference or [])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the querylist parser backends on saved HTML pages.'
+    )
+    parser.add_argument(
+        'html_files',
+        metavar='HTML_FILE',
+        nargs='*',
+        help='Saved querylist pages. A synthetic page is used when none are given.'
+    )
+    parser.add_argument('--rows', type=int, default=5000, help='Rows in the synthetic page.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per backend; the best one is reported.')
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.html_files:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((path, f.read()))
+    if not pages:
+        pages.append((f'synthetic ({args.rows} rows)', make_querylist_html(args.rows)))
+
+    for label, html in pages:
+        timings, n_rows = benchmark(html, args.repeat)
+        baseline = timings['html.parser']
+        print(f"{label}: {n_rows} rows, identical output across backends")
+        for name, elapsed in timings.items():
+            print(f"  {name:<12} {elapsed * 1000:9.1f} ms  {n_rows / elapsed:12.0f} rows/sec  x{baseline / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+from pdp_loader import column_names, load_pdp, read_pdp_csv
+import pandas as pd
+import numpy as np
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+# Value pools of the synthetic PDP file
+states = ['CA', 'NY', 'TX', 'FL', 'WA', 'NH', 'OH', 'MI', 'MN', 'CO', 'MD', 'NC']
+pesticide_names = [
+    'Imidacloprid', 'Thiamethoxam', 'Clothianidin', 'Acetamiprid', 'Boscalid',
+    'Chlorpyrifos', 'Pyraclostrobin', 'Azoxystrobin', 'Carbendazim', 'Fludioxonil',
+]
+commodity_types = ['AP', 'BN', 'MK', 'ST', 'PE', 'GR', 'LT', 'OR']
+
+
+def make_pdp_csv(path, rows, chunk_rows=1000000):
+    """
+    Writes a synthetic headerless PDP file with the 16 columns of
+    USDA_PDP_AnalyticalResults.csv. About 2% of the concentrations are
+    non-numeric, as in the real data.
+    """
+    rng = np.random.default_rng(0)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for start in range(0, rows, chunk_rows):
+            n = min(chunk_rows, rows - start)
+            names = rng.integers(0, len(pesticide_names), n)
+            concentration = np.round(rng.gamma(1.0, 0.05, n), 4).astype(str)
+            concentration[rng.random(n) < 0.02] = 'ND'
+            df = pd.DataFrame({
+                # State code, two-digit year, then a serial number
+                'SampleID': np.char.add(
+                    np.char.add(rng.choice(states, n), np.char.zfill(rng.integers(0, 24, n).astype(str), 2)),
+                    rng.integers(10 ** 5, 10 ** 6, n).astype(str)
+                ),
+                'Type': rng.choice(commodity_types, n),
+                'PesticideCode': names + 100,
+                'PesticideName': np.asarray(pesticide_names)[names],
+                'Category': rng.choice(['F', 'I', 'H'], n),
+                'Concentration': concentration,
+                'Limit': np.round(rng.uniform(0.001, 0.05, n), 4),
+            })
+            for name in column_names[len(df.columns):]:
+                df[name] = 'NA'
+            df.to_csv(f, index=False, header=False)
+
+
+def load_original(csv_file):
+    """
+    The original read in the pesticide scripts: all 16 columns as objects.
+    """
+    df = pd.read_csv(csv_file, names=column_names, header=None, low_memory=False)
+    df['State'] = df['SampleID'].str[:2]
+    df['Concentration'] = pd.to_numeric(df['Concentration'], errors='coerce')
+    return df
+
+
+def load_cached(csv_file, cache_dir):
+    """
+    Maps the memory-mapped cache and touches the 3 columns, so their pages
+    are read (shared with other processes, through the page cache).
+    """
+    df = load_pdp(csv_file, columns=['State', 'PesticideName', 'Concentration'], cache_dir=cache_dir, file_order=False)
+    df['Concentration'].sum()
+    return df
+
+
+def _run(function, args, results):
+    started = time.perf_counter()
+    df = function(*args)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put((elapsed, peak, df.memory_usage(deep=True).sum() / 2 ** 20))
+
+
+def measure(function, *args):
+    """
+    Runs a loader in a fresh process and returns (seconds, peak RSS in MB,
+    size of the resulting DataFrame in MB).
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run, args=(function, args, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the peak memory of the original PDP read, the compact schema and the memory-mapped cache.'
+    )
+    parser.add_argument('--rows', type=int, default=50000000, help='Rows of the synthetic PDP file.')
+    parser.add_argument('--csv', help='Use (or create) this PDP file instead of a temporary one.')
+    parser.add_argument('--skip-original', action='store_true', help='Skip the original read (it may not fit in memory).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = args.csv or os.path.join(directory, 'pdp.csv')
+        if not os.path.isfile(csv_file):
+            print(f"Writing {args.rows} synthetic PDP rows to '{csv_file}'...")
+            # In a child process: Linux carries the peak RSS of this process
+            # over to the processes it starts, which would skew the numbers
+            process = multiprocessing.get_context('spawn').Process(target=make_pdp_csv, args=(csv_file, args.rows))
+            process.start()
+            process.join()
+        print(f"PDP file: {os.path.getsize(csv_file) / 2 ** 20:.0f} MB")
+
+        cache_dir = os.path.join(directory, 'cache')
+        runs = [
+            ('original (16 object columns)', load_original, (csv_file,)),
+            ('compact schema from CSV', read_pdp_csv, (csv_file,)),
+            ('cache build + 3 columns', load_cached, (csv_file, cache_dir)),
+            ('cached, 3 columns', load_cached, (csv_file, cache_dir)),
+        ]
+        for label, function, function_args in runs:
+            if args.skip_original and function is load_original:
+                continue
+            elapsed, peak, size = measure(function, *function_args)
+            print(f"  {label:<30} {elapsed:7.2f} s  peak RSS {peak:8.1f} MB  DataFrame {size:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
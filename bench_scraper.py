@@ -0,0 +1,120 @@
+from replay_server import ReplayServer, default_recordings_dir
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Directory of this script, used to locate scraper.py
+here = os.path.dirname(os.path.abspath(__file__))
+
+
+def count_rows(output_dir):
+    """
+    Counts the data rows (header excluded) of every CSV written to output_dir.
+    """
+    total = 0
+    for path in glob.glob(os.path.join(output_dir, '**', '*.csv'), recursive=True):
+        with open(path, 'r', encoding='utf-8') as f:
+            total += max(sum(1 for _ in f) - 1, 0)
+    return total
+
+
+def run_config(base_url, job, workers, parser, parse_workers):
+    """
+    Runs scraper.py once in a child process against the replay server.
+
+    Returns a dict with pages/sec, rows/sec and the peak RSS of the scraper
+    process (read from wait4, so every configuration is measured on its own).
+    """
+    with tempfile.TemporaryDirectory() as output_dir:
+        manifest_path = os.path.join(output_dir, 'manifest.json')
+        command = [
+            sys.executable, os.path.join(here, 'scraper.py'),
+            '--base-url', base_url,
+            '--job', f"{job}:{output_dir}",
+            '--workers', str(workers),
+            '--parse-workers', str(parse_workers),
+            '--parser', parser,
+            '--no-cache',
+            '--manifest', manifest_path,
+        ]
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            print(f"Error: scraper exited with status {process.returncode} for {command}")
+            sys.exit(1)
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        pages = manifest['totals']['written']
+        elapsed = manifest['elapsed']
+        rows = count_rows(output_dir)
+
+    return {
+        'workers': workers,
+        'parser': parser,
+        'parse_workers': parse_workers,
+        'pages': pages,
+        'rows': rows,
+        'elapsed': elapsed,
+        'pages_per_sec': pages / elapsed if elapsed > 0 else 0.0,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0,
+        'peak_rss_mb': rusage.ru_maxrss / 1024,  # ru_maxrss is in KiB on Linux
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark scraper throughput against the offline replay server.'
+    )
+    parser.add_argument(
+        '--job',
+        default='monarch-larva-spring:spring:2024-1997',
+        help="Job to scrape, as 'map:season:start-end'."
+    )
+    parser.add_argument('--recordings-dir', default=default_recordings_dir, help='Directory of recorded pages.')
+    parser.add_argument(
+        '--synthetic-rows',
+        type=int,
+        default=3000,
+        help='Rows per synthetic page for years without a recording.'
+    )
+    parser.add_argument('--latency', type=float, default=0.05, help='Server delay per response in seconds.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random server delay in seconds.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 5xx error.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8], help='Fetch concurrency levels.')
+    parser.add_argument('--parsers', nargs='+', default=['html.parser', 'lxml'], help='Parser backends.')
+    parser.add_argument('--parse-workers', type=int, nargs='+', default=[0], help='Parser process counts.')
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        recordings_dir=args.recordings_dir,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        synthetic_rows=args.synthetic_rows
+    ).start()
+    print(f"Replay server at {server.base_url} (latency {args.latency}s, error rate {args.error_rate})")
+
+    try:
+        print(f"{'workers':>7} {'parser':<12} {'parse_w':>7} {'pages':>5} {'rows':>8} "
+              f"{'secs':>7} {'pages/s':>8} {'rows/s':>10} {'RSS MB':>7}")
+        for parse_workers in args.parse_workers:
+            for parser_name in args.parsers:
+                for workers in args.workers:
+                    result = run_config(server.base_url, args.job, workers, parser_name, parse_workers)
+                    print(f"{result['workers']:>7} {result['parser']:<12} {result['parse_workers']:>7} "
+                          f"{result['pages']:>5} {result['rows']:>8} {result['elapsed']:>7.2f} "
+                          f"{result['pages_per_sec']:>8.2f} {result['rows_per_sec']:>10.0f} "
+                          f"{result['peak_rss_mb']:>7.1f}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,12 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
+import numpy as np
+from quantile_sketch import sketches
+from outlier_engine import OutlierEngine, apply_mask, compare_masks, default_cache_dir
+import argparse
+import glob
+import os
+import time
 
 # Function to remove outliers from the 'Number' column and save to a new CSV
 def remove_outliers(csv_file_path, output_csv_file_path):
@@ -9,12 +17,8 @@ def remove_outliers(csv_file_path, output_csv_file_path):
     Q1 = df['Number'].quantile(0.25)
     Q3 = df['Number'].quantile(0.75)
 
-    # Calculate Interquartile Range (IQR)
-    IQR = Q3 - Q1
-
     # Define lower and upper bounds for outliers
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
+    lower_bound, upper_bound = iqr_bounds(Q1, Q3)
 
     # Remove rows with 'Number' column values outside the bounds
     df_cleaned = df[(df['Number'] >= lower_bound) & (df['Number'] <= upper_bound)]
@@ -23,9 +27,368 @@ def remove_outliers(csv_file_path, output_csv_file_path):
     df_cleaned.to_csv(output_csv_file_path, index=False)
 
     print(f"Cleaned data saved to {output_csv_file_path}")
+    return len(df_cleaned), len(df) - len(df_cleaned)
+
+# Function to turn the quartiles into the 1.5 * IQR fences
+def iqr_bounds(Q1, Q3):
+    # Calculate Interquartile Range (IQR)
+    IQR = Q3 - Q1
+
+    # Define lower and upper bounds for outliers
+    return Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+
+# Function to remove outliers from the 'Number' column of a CSV too large for memory
+def remove_outliers_streaming(csv_file_path, output_csv_file_path, chunksize=100000, sketch='exact', compare=False):
+    """
+    Removes 'Number' outliers in two passes over the CSV with bounded memory.
+
+    The first pass reads the file in chunks and builds a mergeable quantile
+    summary of 'Number': an exact histogram of its values ('exact', which
+    gives the same quartiles as pandas) or a KLL sketch ('kll', bounded size
+    whatever the number of distinct values). The second pass filters each
+    chunk against the IQR fences and appends it straight to the output.
+
+    Parameters:
+    - csv_file_path (str): Input CSV file.
+    - output_csv_file_path (str): Cleaned CSV file.
+    - chunksize (int): Rows read at a time.
+    - sketch (str): 'exact' or 'kll'.
+    - compare (bool): Also compute the quartiles in memory and report the
+      approximation error (this loads the 'Number' column only).
+
+    Returns the (kept, dropped) row counts.
+    """
+    # Pass 1: build the quantile summary chunk by chunk
+    summary = sketches[sketch]()
+    for chunk in pd.read_csv(csv_file_path, usecols=['Number'], chunksize=chunksize):
+        summary.update(chunk['Number'].to_numpy(dtype='float64'))
+
+    Q1 = summary.quantile(0.25)
+    Q3 = summary.quantile(0.75)
+    lower_bound, upper_bound = iqr_bounds(Q1, Q3)
+    print(f"Q1 = {Q1}, Q3 = {Q3}, keeping Number in [{lower_bound}, {upper_bound}] ({sketch} summary)")
+
+    if compare:
+        numbers = pd.read_csv(csv_file_path, usecols=['Number'])['Number']
+        exact_Q1 = numbers.quantile(0.25)
+        exact_Q3 = numbers.quantile(0.75)
+        exact_lower, exact_upper = iqr_bounds(exact_Q1, exact_Q3)
+        kept = ((numbers >= lower_bound) & (numbers <= upper_bound)).sum()
+        exact_kept = ((numbers >= exact_lower) & (numbers <= exact_upper)).sum()
+        print(f"In-memory Q1 = {exact_Q1}, Q3 = {exact_Q3}")
+        print(f"Absolute error: Q1 {abs(Q1 - exact_Q1)}, Q3 {abs(Q3 - exact_Q3)}")
+        print(f"Rows kept: {kept} (in-memory fences keep {exact_kept}, difference {kept - exact_kept})")
+
+    # Pass 2: filter each chunk and append it to the output
+    kept_rows = 0
+    dropped_rows = 0
+    with open(output_csv_file_path, 'w', newline='', encoding='utf-8') as f:
+        for i, chunk in enumerate(pd.read_csv(csv_file_path, chunksize=chunksize)):
+            chunk_cleaned = chunk[(chunk['Number'] >= lower_bound) & (chunk['Number'] <= upper_bound)]
+            chunk_cleaned.to_csv(f, index=False, header=(i == 0))
+            kept_rows += len(chunk_cleaned)
+            dropped_rows += len(chunk) - len(chunk_cleaned)
+
+    print(f"Cleaned data saved to {output_csv_file_path} ({kept_rows} rows kept, {dropped_rows} dropped)")
+    return kept_rows, dropped_rows
+
+# Grouping keys accepted by remove_outliers_grouped
+group_keys = ['state', 'year', 'season']
+
+# Function to derive the grouping columns from a sightings DataFrame
+def group_columns(df, group_by):
+    """
+    Returns one Series per requested grouping key.
+
+    - 'state': State/Province, stripped and uppercased.
+    - 'year': year of the Date column.
+    - 'season': the Season column when there is one, otherwise 'spring' for
+      January-June sightings and 'fall' for July-December ones.
+    """
+    columns = []
+    dates = None
+    for key in group_by:
+        if key == 'state':
+            columns.append(df['State/Province'].astype(str).str.strip().str.upper().rename('state'))
+        elif key in ('year', 'season'):
+            if key == 'season' and 'Season' in df.columns:
+                columns.append(df['Season'].rename('season'))
+                continue
+            if dates is None:
+                dates = pd.to_datetime(df['Date'], errors='coerce')
+            if key == 'year':
+                columns.append(dates.dt.year.rename('year'))
+            else:
+                columns.append(pd.Series(np.where(dates.dt.month <= 6, 'spring', 'fall'), index=df.index, name='season'))
+        else:
+            raise ValueError(f"Unknown group key '{key}', expected one of {group_keys}.")
+    return columns
+
+# Function to compute the IQR fences of every group in one sort
+def grouped_iqr_bounds(codes, values, n_groups):
+    """
+    Computes per-group Q1/Q3 fences with one lexsort over (group, value).
+
+    Quartiles interpolate like pandas' quantile. Returns (lower, upper, counts)
+    arrays indexed by group code; groups without values get NaN fences.
+    """
+    valid = ~np.isnan(values)
+    codes = codes[valid]
+    values = values[valid]
+
+    # Sort by group, then by value: each group becomes one sorted run
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    def quantile(q):
+        position = (counts - 1) * q
+        lower_rank = np.floor(position).astype(np.int64)
+        fraction = position - lower_rank
+        upper_rank = np.minimum(lower_rank + 1, counts - 1)
+        result = np.full(n_groups, np.nan)
+        has_values = counts > 0
+        lower = sorted_values[(starts + lower_rank)[has_values]]
+        upper = sorted_values[(starts + upper_rank)[has_values]]
+        result[has_values] = lower + (upper - lower) * fraction[has_values]
+        return result
+
+    lower_bound, upper_bound = iqr_bounds(quantile(0.25), quantile(0.75))
+    return lower_bound, upper_bound, counts
+
+# Function to remove outliers from the 'Number' column separately within each group
+def remove_outliers_grouped(csv_file_path, output_csv_file_path, group_by=('state',), min_group_size=0):
+    """
+    Removes 'Number' outliers with IQR fences computed per group instead of
+    globally (500 adults is an outlier in Maine but not at a Texas roost).
+
+    All groups are handled at once: rows are factorized into group codes and
+    the quartiles of every group come from a single sort, so the cost does
+    not depend on the number of groups.
+
+    Parameters:
+    - csv_file_path (str): Input CSV file.
+    - output_csv_file_path (str): Cleaned CSV file.
+    - group_by (list of str): Any combination of 'state', 'year' and 'season'.
+    - min_group_size (int): Groups with fewer 'Number' values are kept whole.
+
+    Returns the (kept, dropped) row counts.
+    """
+    df = pd.read_csv(csv_file_path)
+
+    # Factorize the group keys into one integer code per row
+    keys = group_columns(df, group_by)
+    codes = pd.concat(keys, axis=1).groupby([key.name for key in keys], dropna=False, sort=False).ngroup().to_numpy()
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+
+    numbers = pd.to_numeric(df['Number'], errors='coerce').to_numpy(dtype='float64')
+    lower_bound, upper_bound, counts = grouped_iqr_bounds(codes, numbers, n_groups)
+
+    # Broadcast the fences back to the rows
+    row_lower = lower_bound[codes]
+    row_upper = upper_bound[codes]
+    keep = (numbers >= row_lower) & (numbers <= row_upper)
+    if min_group_size:
+        keep |= counts[codes] < min_group_size
+
+    df_cleaned = df[keep]
+    df_cleaned.to_csv(output_csv_file_path, index=False)
+    print(f"Cleaned data saved to {output_csv_file_path} "
+          f"({n_groups} groups by {', '.join(group_by)}; {int(keep.sum())} rows kept, {int((~keep).sum())} dropped)")
+    return int(keep.sum()), int((~keep).sum())
+
+# Function to remove rows flagged by any of several outlier methods
+def remove_outliers_methods(csv_file_path, output_csv_file_path, method_specs, cache_dir=default_cache_dir):
+    """
+    Removes rows rejected by any of the given outlier methods.
+
+    Each spec is 'method[:name=value,...][@column]' with method one of iqr,
+    mad, zscore or pcap (see outlier_engine.parse_method). The keep-masks are
+    cached, so rerunning with other combinations of already computed methods
+    does not rescan the CSV. With several methods, a table comparing them is
+    printed first.
+
+    Parameters:
+    - csv_file_path (str): Input CSV file.
+    - output_csv_file_path (str): Cleaned CSV file.
+    - method_specs (list of str): Outlier methods to apply.
+    - cache_dir (str): Directory of the cached masks.
+
+    Returns the (kept, dropped) row counts.
+    """
+    engine = OutlierEngine(cache_dir)
+    masks = engine.masks(csv_file_path, method_specs)
+    print(f"{len(masks)} masks ready ({'computed in one scan' if engine.scans else 'all from the cache'})")
+    if len(masks) > 1:
+        print(compare_masks(masks).to_string())
+
+    keep = np.logical_and.reduce(list(masks.values()))
+    kept_rows = apply_mask(csv_file_path, output_csv_file_path, keep)
+    print(f"Cleaned data saved to {output_csv_file_path} ({kept_rows} rows kept, {len(keep) - kept_rows} dropped)")
+    return kept_rows, len(keep) - kept_rows
+
+# Function to clean one file with the method selected by the options
+def clean_file(csv_file_path, output_csv_file_path, options):
+    """
+    Dispatches to the cleaning function selected by options, a dict with the
+    keys of the command-line flags (methods, group_by, stream, ...).
+
+    Returns the (kept, dropped) row counts.
+    """
+    if options.get('methods'):
+        return remove_outliers_methods(csv_file_path, output_csv_file_path, options['methods'],
+                                       options.get('cache_dir', default_cache_dir))
+    if options.get('group_by'):
+        return remove_outliers_grouped(csv_file_path, output_csv_file_path, options['group_by'],
+                                       options.get('min_group_size', 0))
+    if options.get('stream'):
+        return remove_outliers_streaming(csv_file_path, output_csv_file_path, options.get('chunksize', 100000),
+                                         options.get('sketch', 'exact'), options.get('compare', False))
+    return remove_outliers(csv_file_path, output_csv_file_path)
+
+# Suffix of the files written by clean_batch
+cleaned_suffix = '_cleaned.csv'
+
+# Function to list the CSV files named by directories, globs and paths
+def expand_inputs(inputs):
+    """
+    Expands directories (every CSV below them) and glob patterns into a
+    sorted list of CSV paths, skipping files a previous batch produced.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, '**', '*.csv'), recursive=True))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        for path in matches:
+            if path.endswith(cleaned_suffix) or path in paths:
+                continue
+            paths.append(path)
+    return paths
+
+# Function to run clean_file in a worker process and time it
+def _clean_one(task):
+    csv_file_path, output_csv_file_path, options = task
+    started = time.perf_counter()
+    try:
+        if os.path.dirname(output_csv_file_path):
+            os.makedirs(os.path.dirname(output_csv_file_path), exist_ok=True)
+        kept, dropped = clean_file(csv_file_path, output_csv_file_path, options)
+        status = 'ok'
+    except Exception as e:
+        kept, dropped = 0, 0
+        status = f'error: {type(e).__name__}: {e}'
+    return {
+        'file': csv_file_path,
+        'output': output_csv_file_path,
+        'kept': kept,
+        'dropped': dropped,
+        'seconds': round(time.perf_counter() - started, 3),
+        'status': status,
+    }
+
+# Function to clean many sighting files in parallel
+def clean_batch(inputs, output_dir=None, options=None, workers=None):
+    """
+    Cleans every CSV named by inputs (directories, globs or paths) on a
+    process pool and returns a summary DataFrame with the rows kept and
+    dropped and the time spent on each file.
+
+    Largest files are submitted first so one big file does not end up alone
+    on a core at the end of the run.
+
+    Parameters:
+    - inputs (list of str): Directories, glob patterns or CSV files.
+    - output_dir (str): Where to write '<name>_cleaned.csv', mirroring the
+      input directories; next to each input when None.
+    - options (dict): Cleaning options, see clean_file.
+    - workers (int): Worker processes (defaults to the number of CPUs).
+    """
+    paths = expand_inputs(inputs)
+    if not paths:
+        print("No CSV files to clean.")
+        return pd.DataFrame(columns=['file', 'output', 'kept', 'dropped', 'seconds', 'status'])
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+
+    tasks = []
+    for path in sorted(paths, key=os.path.getsize, reverse=True):
+        name = os.path.splitext(os.path.basename(path))[0] + cleaned_suffix
+        if output_dir:
+            relative_dir = os.path.relpath(os.path.dirname(os.path.abspath(path)), base)
+            output_path = os.path.normpath(os.path.join(output_dir, relative_dir, name))
+        else:
+            output_path = os.path.join(os.path.dirname(path), name)
+        tasks.append((path, output_path, options or {}))
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_clean_one, task) for task in tasks]
+        for future in as_completed(futures):
+            results.append(future.result())
+    elapsed = time.perf_counter() - started
+
+    summary = pd.DataFrame(results).sort_values('file', ignore_index=True)
+    total_seconds = summary['seconds'].sum()
+    print(summary.to_string(index=False))
+    print(f"Cleaned {(summary['status'] == 'ok').sum()}/{len(summary)} files: {summary['kept'].sum()} rows kept, "
+          f"{summary['dropped'].sum()} dropped in {elapsed:.2f}s "
+          f"({total_seconds:.2f}s of cleaning across {workers or os.cpu_count() or 1} workers)")
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Remove outliers from the 'Number' column of a sightings CSV.")
+    parser.add_argument('input_csv', nargs='?', default='./fall/monarch_larva_concatenated.csv', help='Input CSV file.')
+    parser.add_argument('output_csv', nargs='?', default='./fall/monarch_larva_cleaner.csv', help='Cleaned CSV file.')
+    parser.add_argument('--stream', action='store_true', help='Two-pass out-of-core cleaning with bounded memory.')
+    parser.add_argument('--chunksize', type=int, default=100000, help='Rows per chunk in --stream mode.')
+    parser.add_argument('--sketch', choices=sorted(sketches), default='exact', help='Quantile summary used by --stream.')
+    parser.add_argument(
+        '--group-by',
+        nargs='+',
+        choices=group_keys,
+        help='Compute the IQR fences separately per group (e.g. --group-by state year).'
+    )
+    parser.add_argument('--min-group-size', type=int, default=0, help='Keep groups with fewer values whole.')
+    parser.add_argument(
+        '--methods',
+        nargs='+',
+        metavar='SPEC',
+        help="Outlier methods to combine, e.g. iqr mad:threshold=3 zscore@Latitude pcap:upper=0.995 (masks are cached)."
+    )
+    parser.add_argument('--cache-dir', default=default_cache_dir, help='Directory of the cached --methods masks.')
+    parser.add_argument('--compare', action='store_true', help='Report the error of --stream against the in-memory quartiles.')
+    parser.add_argument(
+        '--batch',
+        nargs='+',
+        metavar='INPUT',
+        help='Clean every CSV under these directories or globs in parallel (input_csv/output_csv are ignored).'
+    )
+    parser.add_argument('--output-dir', help="Directory of the --batch outputs (default: next to each input).")
+    parser.add_argument('-j', '--workers', type=int, default=None, help='Worker processes for --batch (default: all CPUs).')
+    parser.add_argument('--summary', help='Also write the --batch summary table to this CSV file.')
+    args = parser.parse_args()
 
-# Use the function with your CSV file paths
-csv_file_path = './fall/monarch_larva_concatenated.csv'  # Replace with your input CSV file path
-output_csv_file_path = './fall/monarch_larva_cleaner.csv'  # Replace with desired output CSV file path
-remove_outliers(csv_file_path, output_csv_file_path)
+    options = {
+        'methods': args.methods,
+        'cache_dir': args.cache_dir,
+        'group_by': args.group_by,
+        'min_group_size': args.min_group_size,
+        'stream': args.stream,
+        'chunksize': args.chunksize,
+        'sketch': args.sketch,
+        'compare': args.compare,
+    }
 
+    # Use the function with your CSV file paths
+    if args.batch:
+        summary = clean_batch(args.batch, args.output_dir, options, args.workers)
+        if args.summary:
+            summary.to_csv(args.summary, index=False)
+            print(f"Summary saved to {args.summary}")
+    else:
+        clean_file(args.input_csv, args.output_csv, options)
@@ -0,0 +1,121 @@
+from concatenator import concatenate_csvs, concatenate_csvs_parallel, concatenate_csvs_streaming
+import pandas as pd
+import numpy as np
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+
+def make_inputs(directory, n_files, rows_per_file):
+    """
+    Writes n_files synthetic yearly sighting CSVs (scraper layout) and returns their paths.
+    """
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(n_files):
+        df = pd.DataFrame({
+            'Index': np.arange(rows_per_file, 0, -1),
+            'Date': pd.Timestamp('2024-03-01') + pd.to_timedelta(rng.integers(0, 200, rows_per_file), unit='D'),
+            'Town': [f'Town {j}' for j in rng.integers(0, 5000, rows_per_file)],
+            'State/Province': rng.choice(['TX', 'OK', 'KS', 'MN', 'ON', 'WI'], rows_per_file),
+            'Latitude': rng.uniform(25, 50, rows_per_file).round(3),
+            'Longitude': rng.uniform(-110, -70, rows_per_file).round(3),
+            'Number': rng.integers(1, 200, rows_per_file),
+            'Image': rng.integers(0, 2, rows_per_file),
+        })
+        path = os.path.join(directory, f'monarch-larva-spring_{i:04d}.csv')
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def concatenate_csvs_quadratic(input_csv_paths, output_csv_path):
+    """
+    The original implementation: grow one DataFrame with pd.concat per file.
+    """
+    concatenated_df = pd.DataFrame()
+    for csv_path in input_csv_paths:
+        df = pd.read_csv(csv_path).iloc[:, 1:]
+        concatenated_df = pd.concat([concatenated_df, df], ignore_index=True)
+    concatenated_df.to_csv(output_csv_path, index=False)
+
+
+def concatenate_streaming(input_csv_paths, output_path, chunksize):
+    concatenate_csvs_streaming(input_csv_paths, output_path, chunksize)
+
+
+def _run(function, args, results):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function(*args)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux
+    results.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def measure(function, *args):
+    """
+    Runs a function quietly in a fresh process and returns (seconds, peak RSS in MB).
+    Worker processes started by the function are not included in the RSS.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run, args=(function, args, results))
+    process.start()
+    elapsed, peak = results.get()
+    process.join()
+    return elapsed, peak
+
+
+def same_values(expected, actual):
+    """
+    Compares two outputs by value. The Parquet output keeps its reconciled
+    nullable dtypes (Int64, string), where a CSV read back gets numpy ones.
+    """
+    try:
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the in-memory and streaming CSV concatenation.'
+    )
+    parser.add_argument('--files', type=int, default=300, help='Number of input CSV files.')
+    parser.add_argument('--rows', type=int, default=2000, help='Rows per input file.')
+    parser.add_argument('--chunksize', type=int, default=50000, help='Rows per chunk in streaming mode.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_inputs(directory, args.files, args.rows)
+        print(f"{args.files} input files x {args.rows} rows")
+
+        runs = [
+            ('quadratic pd.concat (original)', concatenate_csvs_quadratic, os.path.join(directory, 'quadratic.csv')),
+            ('in-memory (single pd.concat)', concatenate_csvs, os.path.join(directory, 'memory.csv')),
+            ('streaming to CSV', concatenate_streaming, os.path.join(directory, 'stream.csv')),
+            ('streaming to Parquet', concatenate_streaming, os.path.join(directory, 'stream.parquet')),
+            ('parallel to CSV', concatenate_csvs_parallel, os.path.join(directory, 'parallel.csv')),
+        ]
+        for label, function, output_path in runs:
+            extra = (args.chunksize,) if function is concatenate_streaming else ()
+            elapsed, peak = measure(function, paths, output_path, *extra)
+            print(f"  {label:<32} {elapsed:7.2f} s  peak RSS {peak:8.1f} MB")
+
+        reference = pd.read_csv(os.path.join(directory, 'quadratic.csv'))
+        outputs = {name: pd.read_csv(os.path.join(directory, name)) for name in ('memory.csv', 'stream.csv', 'parallel.csv')}
+        outputs['stream.parquet'] = pd.read_parquet(os.path.join(directory, 'stream.parquet'))
+        for name, output in outputs.items():
+            if not same_values(reference, output):
+                print(f"Error: '{name}' differs from the original output.")
+
+
+if __name__ == '__main__':
+    main()
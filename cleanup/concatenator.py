@@ -1,8 +1,19 @@
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 import argparse
+import glob
+import hashlib
+import json
 import os
+import shutil
 import sys
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for Parquet output
+    pa = None
+
 def concatenate_csvs(input_csv_paths, output_csv_path):
     """
     Concatenates multiple CSV files by removing their first columns and combining the remaining data.
@@ -12,7 +23,7 @@ def concatenate_csvs(input_csv_paths, output_csv_path):
     - output_csv_path (str): Path where the concatenated CSV will be saved.
     """
     try:
-        concatenated_df = pd.DataFrame()
+        frames = []
         columns_reference = None  # To check column consistency across CSVs
 
         for idx, csv_path in enumerate(input_csv_paths):
@@ -43,10 +54,12 @@ def concatenate_csvs(input_csv_paths, output_csv_path):
                     print(f"Current CSV columns: {list(df.columns)}")
                     print("Proceeding with concatenation, but the resulting CSV may have mismatched columns.")
             
-            # Append to the concatenated dataframe
-            concatenated_df = pd.concat([concatenated_df, df], ignore_index=True)
+            # Collect the frame; everything is concatenated once at the end
+            frames.append(df)
             print(f"Appended data from '{csv_path}'.")
 
+        concatenated_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
         # Write the concatenated dataframe to the output CSV file
         print(f"Writing the concatenated data to '{output_csv_path}'...")
         concatenated_df.to_csv(output_csv_path, index=False)
@@ -62,6 +75,439 @@ def concatenate_csvs(input_csv_paths, output_csv_path):
         print(f"An unexpected error occurred: {e}")
         sys.exit(1)
 
+def check_inputs(input_csv_paths):
+    """
+    Reads only the header of every input and returns the union of their
+    columns (first column removed), in order of first appearance.
+
+    Exits with an error if an input is missing or has fewer than two columns,
+    and warns when an input's columns differ from the first one's.
+    """
+    union_columns = []
+    columns_reference = None
+    for csv_path in input_csv_paths:
+        if not os.path.isfile(csv_path):
+            print(f"Error: The file '{csv_path}' does not exist.")
+            sys.exit(1)
+        columns = list(pd.read_csv(csv_path, nrows=0).columns)
+        if len(columns) < 2:
+            print(f"Error: The CSV '{csv_path}' does not have enough columns to remove the first one.")
+            sys.exit(1)
+        columns = columns[1:]
+        if columns_reference is None:
+            columns_reference = columns
+        elif columns != columns_reference:
+            print(f"Warning: The columns in '{csv_path}' do not match the reference columns.")
+            print(f"Reference columns: {columns_reference}")
+            print(f"Current CSV columns: {columns}")
+        for column in columns:
+            if column not in union_columns:
+                union_columns.append(column)
+    return union_columns
+
+
+class ChunkWriter:
+    """
+    Appends DataFrame chunks to a CSV or Parquet file (chosen by the output
+    extension) without keeping earlier chunks in memory.
+
+    For Parquet the schema comes from dtypes ({column: pandas dtype}, e.g.
+    reconciled over every input), so each chunk is converted to the same
+    types however its own values look; without dtypes it is fixed by the
+    first chunk and later chunks are cast to it.
+    """
+
+    def __init__(self, output_path, dtypes=None):
+        self.output_path = output_path
+        self.parquet = output_path.lower().endswith('.parquet')
+        if self.parquet and pa is None:
+            raise ImportError("Parquet output requires the pyarrow package.")
+        self.writer = None
+        self.schema = None
+        if self.parquet and dtypes is not None:
+            empty = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+            self.schema = pa.Schema.from_pandas(empty, preserve_index=False)
+        self.csvfile = None
+        self.rows = 0
+
+    def write(self, chunk):
+        if self.parquet:
+            if self.schema is not None:
+                table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+            else:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                self.schema = table.schema
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.output_path, self.schema)
+            else:
+                table = table.cast(self.schema)
+            self.writer.write_table(table)
+        else:
+            if self.csvfile is None:
+                self.csvfile = open(self.output_path, 'w', newline='', encoding='utf-8')
+                chunk.to_csv(self.csvfile, index=False)
+            else:
+                chunk.to_csv(self.csvfile, index=False, header=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.csvfile is not None:
+            self.csvfile.close()
+
+
+def concatenate_csvs_streaming(input_csv_paths, output_path, chunksize=100000):
+    """
+    Concatenates CSV files chunk by chunk, removing their first columns, and
+    appends each chunk straight to the output (CSV, or Parquet when the
+    output ends in '.parquet').
+
+    Memory stays bounded by the chunk size and the runtime is linear in the
+    total number of rows. Inputs whose columns differ are aligned to the
+    union of all columns, as the in-memory concatenation does. For Parquet
+    output a first chunked pass reconciles the column types of all inputs
+    (see reconcile_kinds), and every chunk is read with those types.
+
+    Parameters:
+    - input_csv_paths (list of str): Paths to the input CSV files.
+    - output_path (str): Path where the concatenated file will be saved.
+    - chunksize (int): Number of rows read at a time.
+    """
+    try:
+        union_columns = check_inputs(input_csv_paths)
+        dtypes = None
+        if output_path.lower().endswith('.parquet'):
+            # Parquet needs one schema before the first chunk is written
+            file_kinds = [_column_kinds(csv_path, chunksize) for csv_path in input_csv_paths]
+            dtypes = {
+                column: reconciled_dtypes[reconcile_kinds([kinds.get(column) for kinds in file_kinds])]
+                for column in union_columns
+            }
+            print(f"Reconciled schema: {dtypes}")
+        writer = ChunkWriter(output_path, dtypes)
+        try:
+            for csv_path in input_csv_paths:
+                print(f"Streaming '{csv_path}'...")
+                read_dtypes = None
+                if dtypes is not None:
+                    header = list(pd.read_csv(csv_path, nrows=0).columns)
+                    read_dtypes = {column: dtypes[column] for column in header[1:] if column in dtypes}
+                for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=read_dtypes):
+                    # Remove the first column and align to the union of columns
+                    chunk = chunk.iloc[:, 1:].reindex(columns=union_columns)
+                    writer.write(chunk)
+        finally:
+            writer.close()
+        print(f"Wrote {writer.rows} rows to '{output_path}'.")
+        print("Concatenation completed successfully!")
+
+    except pd.errors.EmptyDataError:
+        print(f"Error: One of the input CSV files is empty.")
+        sys.exit(1)
+    except pd.errors.ParserError as pe:
+        print(f"Error parsing CSV files: {pe}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        sys.exit(1)
+
+# pandas dtype used for each reconciled column kind
+reconciled_dtypes = {'b': 'boolean', 'i': 'Int64', 'f': 'float64', 'O': 'string'}
+
+
+def reconcile_kinds(kinds):
+    """
+    Returns the single column kind that can hold every kind in the list.
+
+    Kinds are numpy dtype kinds ('b', 'i', 'f', 'O'); None means the column
+    was empty in that file and does not constrain the result.
+    """
+    kinds = {kind for kind in kinds if kind is not None}
+    if not kinds:
+        return 'O'
+    if len(kinds) == 1:
+        return kinds.pop()
+    if kinds <= {'i', 'f'}:
+        return 'f'
+    return 'O'
+
+
+def _column_kinds(csv_path, chunksize=None):
+    """
+    Reads one input (chunk by chunk with chunksize) and returns {column: kind}
+    for every column but the first.
+    """
+    chunks = pd.read_csv(csv_path, chunksize=chunksize) if chunksize else [pd.read_csv(csv_path)]
+    kinds = {}
+    for df in chunks:
+        for column in df.columns[1:]:
+            series = df[column]
+            if series.isna().all():
+                kind = None
+            elif series.dtype.kind in ('b', 'i', 'u'):
+                kind = 'b' if series.dtype.kind == 'b' else 'i'
+            elif series.dtype.kind == 'f':
+                kind = 'f'
+            else:
+                kind = 'O'
+            # A column empty so far takes the kind of the first chunk with values
+            previous = kinds.get(column)
+            if previous is None or kind is None:
+                kinds[column] = previous or kind
+            else:
+                kinds[column] = reconcile_kinds([previous, kind])
+    return kinds
+
+
+def _read_aligned(task):
+    """
+    Reads one input with the reconciled dtypes and returns it already in the
+    output column order: CSV text without a header, or an Arrow table.
+    """
+    csv_path, union_columns, dtypes, parquet = task
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    present = [column for column in header[1:] if column in dtypes]
+    df = pd.read_csv(csv_path, usecols=present, dtype={column: dtypes[column] for column in present})
+
+    # Build the output frame column by column; missing columns are all-NA
+    columns = {}
+    for column in union_columns:
+        if column in df.columns:
+            columns[column] = df[column]
+        else:
+            columns[column] = pd.Series(index=df.index, dtype=dtypes[column])
+    aligned = pd.DataFrame(columns, copy=False)
+
+    if parquet:
+        return pa.Table.from_pandas(aligned, preserve_index=False), len(aligned)
+    return aligned.to_csv(index=False, header=False), len(aligned)
+
+
+def concatenate_csvs_parallel(input_csv_paths, output_path, workers=None):
+    """
+    Concatenates CSV files on a pool of processes, removing their first
+    columns, and streams the result to a CSV or Parquet output.
+
+    The union schema is computed once: a first parallel pass infers each
+    file's column types and reconciles them (integers and floats become
+    floats, mixed types become strings, integers stay nullable integers).
+    The second pass reads every file with those dtypes and hands it back
+    already in the output column order, so the writer only appends.
+
+    Parameters:
+    - input_csv_paths (list of str): Paths to the input CSV files.
+    - output_path (str): Path where the concatenated file will be saved
+      (Parquet when it ends in '.parquet').
+    - workers (int): Number of processes (None uses every core).
+    """
+    try:
+        union_columns = check_inputs(input_csv_paths)
+        parquet = output_path.lower().endswith('.parquet')
+        if parquet and pa is None:
+            raise ImportError("Parquet output requires the pyarrow package.")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Pass 1: reconcile the column types of all inputs
+            file_kinds = list(pool.map(_column_kinds, input_csv_paths))
+            dtypes = {
+                column: reconciled_dtypes[reconcile_kinds([kinds.get(column) for kinds in file_kinds])]
+                for column in union_columns
+            }
+            print(f"Reconciled schema: {dtypes}")
+
+            # Pass 2: read with the reconciled dtypes and append in input order,
+            # keeping only a bounded window of files in flight
+            window = 2 * (workers or os.cpu_count() or 1)
+            tasks = [(csv_path, union_columns, dtypes, parquet) for csv_path in input_csv_paths]
+            pending = [pool.submit(_read_aligned, task) for task in tasks[:window]]
+            next_task = len(pending)
+            rows = 0
+            writer = None
+            csvfile = None
+            try:
+                while pending:
+                    result, n_rows = pending.pop(0).result()
+                    if next_task < len(tasks):
+                        pending.append(pool.submit(_read_aligned, tasks[next_task]))
+                        next_task += 1
+                    if parquet:
+                        if writer is None:
+                            writer = pq.ParquetWriter(output_path, result.schema)
+                        writer.write_table(result)
+                    else:
+                        if csvfile is None:
+                            csvfile = open(output_path, 'w', newline='', encoding='utf-8')
+                            csvfile.write(pd.DataFrame(columns=union_columns).to_csv(index=False))
+                        csvfile.write(result)
+                    rows += n_rows
+            finally:
+                if writer is not None:
+                    writer.close()
+                if csvfile is not None:
+                    csvfile.close()
+
+        print(f"Wrote {rows} rows from {len(input_csv_paths)} files to '{output_path}'.")
+        print("Concatenation completed successfully!")
+
+    except pd.errors.EmptyDataError:
+        print(f"Error: One of the input CSV files is empty.")
+        sys.exit(1)
+    except pd.errors.ParserError as pe:
+        print(f"Error parsing CSV files: {pe}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        sys.exit(1)
+
+def expand_inputs(inputs, output_path=None):
+    """
+    Expands directories (every CSV below them) and glob patterns into a sorted
+    list of CSV paths. Plain paths are kept as given; the output itself and
+    the manifest and segments of --incremental ('<output>.manifest.json',
+    '<output>.parts/') are never treated as inputs.
+    """
+    excluded = set()
+    parts_dir = None
+    if output_path:
+        output = os.path.abspath(output_path)
+        excluded = {output, f'{output}.manifest.json', f'{output}.tmp'}
+        parts_dir = f'{output}.parts' + os.sep
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, '**', '*.csv'), recursive=True))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        for path in matches:
+            absolute = os.path.abspath(path)
+            if absolute in excluded or (parts_dir and absolute.startswith(parts_dir)):
+                continue
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def concatenate_csvs_incremental(inputs, output_path):
+    """
+    Rebuilds a concatenated CSV from directories, globs or files, re-reading
+    only the inputs that changed since the last run.
+
+    A manifest next to the output ('<output>.manifest.json') records each
+    input's size, mtime and SHA-256. Each input's contribution (first column
+    removed, aligned to the union of columns) is kept as a segment under
+    '<output>.parts/'. On rerun, inputs whose size and mtime (or, failing
+    that, hash) are unchanged reuse their segment; only new or changed files
+    are parsed, and the output is spliced together from the segments in
+    input order by plain byte copies. A change to the union of columns
+    realigns every segment.
+
+    Parameters:
+    - inputs (list of str): Input CSV files, directories or glob patterns.
+    - output_path (str): Path where the concatenated CSV will be saved.
+    """
+    if output_path.lower().endswith('.parquet'):
+        print("Error: Incremental mode writes CSV output only.")
+        sys.exit(1)
+    try:
+        input_csv_paths = expand_inputs(inputs, output_path)
+        if not input_csv_paths:
+            print("Error: No input CSV files were found.")
+            sys.exit(1)
+        union_columns = check_inputs(input_csv_paths)
+
+        manifest_path = f'{output_path}.manifest.json'
+        parts_dir = f'{output_path}.parts'
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = {'columns': None, 'inputs': {}}
+
+        if manifest['columns'] != union_columns:
+            if manifest['columns'] is not None:
+                print("The union of columns changed; every input will be realigned.")
+            manifest = {'columns': union_columns, 'inputs': {}}
+        os.makedirs(parts_dir, exist_ok=True)
+
+        entries = {}
+        reread = 0
+        for csv_path in input_csv_paths:
+            stat = os.stat(csv_path)
+            previous = manifest['inputs'].get(csv_path)
+            segment = previous and os.path.join(parts_dir, previous['segment'])
+            if (previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns
+                    and os.path.isfile(segment)):
+                entries[csv_path] = previous
+                continue
+
+            digest = file_sha256(csv_path)
+            if previous and previous['sha256'] == digest and os.path.isfile(segment):
+                entries[csv_path] = dict(previous, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                continue
+
+            # New or changed input: parse it and write its segment
+            print(f"Reading changed input '{csv_path}'...")
+            df = pd.read_csv(csv_path)
+            df = df.iloc[:, 1:].reindex(columns=union_columns)
+            segment_name = f'{digest}.csv'
+            segment_path = os.path.join(parts_dir, segment_name)
+            df.to_csv(f'{segment_path}.tmp', index=False, header=False)
+            os.replace(f'{segment_path}.tmp', segment_path)
+            entries[csv_path] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': digest,
+                'segment': segment_name,
+                'rows': len(df),
+            }
+            reread += 1
+
+        # Splice the segments together in input order
+        tmp_output = f'{output_path}.tmp'
+        with open(tmp_output, 'w', newline='', encoding='utf-8') as out:
+            out.write(pd.DataFrame(columns=union_columns).to_csv(index=False))
+        with open(tmp_output, 'ab') as out:
+            for csv_path in input_csv_paths:
+                with open(os.path.join(parts_dir, entries[csv_path]['segment']), 'rb') as segment:
+                    shutil.copyfileobj(segment, out)
+        os.replace(tmp_output, output_path)
+
+        # Forget segments no input refers to any more
+        used = {entry['segment'] for entry in entries.values()}
+        for name in os.listdir(parts_dir):
+            if name not in used:
+                os.remove(os.path.join(parts_dir, name))
+
+        manifest = {'columns': union_columns, 'inputs': entries}
+        with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f'{manifest_path}.tmp', manifest_path)
+
+        rows = sum(entry['rows'] for entry in entries.values())
+        print(f"Re-read {reread} of {len(input_csv_paths)} inputs; wrote {rows} rows to '{output_path}'.")
+        print("Concatenation completed successfully!")
+
+    except pd.errors.EmptyDataError:
+        print(f"Error: One of the input CSV files is empty.")
+        sys.exit(1)
+    except pd.errors.ParserError as pe:
+        print(f"Error parsing CSV files: {pe}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        sys.exit(1)
+
 def main():
     # Initialize the argument parser
     parser = argparse.ArgumentParser(
@@ -74,21 +520,60 @@ def main():
         metavar='INPUT_CSV',
         type=str,
         nargs='+',
-        help='Paths to the input CSV files to be concatenated.'
+        help='Input CSV files to be concatenated; directories and glob patterns are expanded.'
     )
     parser.add_argument(
         '-o', '--output',
         dest='output_csv',
         type=str,
         required=True,
-        help='Path to save the concatenated CSV file.'
+        help="Path to save the concatenated file (a '.parquet' path requires --stream or --parallel)."
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Read the inputs in chunks and append them to the output with constant memory.'
+    )
+    parser.add_argument(
+        '--parallel',
+        action='store_true',
+        help='Read the inputs on a process pool with one reconciled schema and stream the result out.'
+    )
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=None,
+        help='Number of processes in --parallel mode (default: all cores).'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Keep a manifest and per-input segments so reruns only re-read new or changed inputs (CSV output).'
+    )
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        default=100000,
+        help='Rows per chunk in --stream mode.'
     )
 
     # Parse the arguments
     args = parser.parse_args()
+    if args.output_csv.lower().endswith('.parquet') and (args.incremental or not (args.stream or args.parallel)):
+        parser.error("A '.parquet' output requires --stream or --parallel (and cannot be --incremental).")
 
     # Call the concatenate function with the provided arguments
-    concatenate_csvs(args.input_csvs, args.output_csv)
+    if args.incremental:
+        concatenate_csvs_incremental(args.input_csvs, args.output_csv)
+        return
+
+    input_csvs = expand_inputs(args.input_csvs, args.output_csv)
+    if args.parallel:
+        concatenate_csvs_parallel(input_csvs, args.output_csv, args.workers)
+    elif args.stream:
+        concatenate_csvs_streaming(input_csvs, args.output_csv, args.chunksize)
+    else:
+        concatenate_csvs(input_csvs, args.output_csv)
 
 if __name__ == '__main__':
     main()
@@ -1,4 +1,14 @@
 import pandas as pd
+import numpy as np
+import argparse
+import os
+
+# Columns that identify a sighting when deduplicating appends
+key_columns = ['Date', 'Town', 'State/Province', 'Latitude', 'Longitude', 'Number']
+
+# Key columns compared as numbers, so '30.10' and '30.1' are the same sighting
+numeric_key_columns = ['Latitude', 'Longitude', 'Number']
+
 
 def concatenate_csvs(csv1_path, csv2_path, output_path):
     # Load CSV files
@@ -15,6 +25,115 @@ def concatenate_csvs(csv1_path, csv2_path, output_path):
     # Write the concatenated dataframe to the output CSV file
     concatenated_df.to_csv(output_path, index=False)
 
-# Example usage
-concatenate_csvs('full_larva_2024.csv', './raw_spring/monarch_larva_first/monarch-larva-first_2024.csv', 'full_larva_2024.csv')
 
+def key_index_path(consolidated_path):
+    # The hash index lives next to the consolidated file
+    return f'{consolidated_path}.keys.npz'
+
+
+def row_key_hashes(df):
+    """
+    Returns one uint64 hash per row of the sighting key columns.
+
+    Numeric columns are hashed as floats and text columns as stripped strings,
+    so the hash does not depend on how a file happened to format its values.
+    """
+    keys = pd.DataFrame(index=df.index)
+    for column in key_columns:
+        if column in numeric_key_columns:
+            keys[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+        else:
+            keys[column] = df[column].astype(str).str.strip()
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+
+def save_key_index(consolidated_path, hashes):
+    # Record the file size the index belongs to, so a stale index is detected
+    path = key_index_path(consolidated_path)
+    tmp_path = f'{path}.tmp.npz'
+    np.savez(tmp_path, hashes=hashes, size=np.int64(os.path.getsize(consolidated_path)))
+    os.replace(tmp_path, path)
+
+
+def load_key_index(consolidated_path):
+    """
+    Returns the sorted array of row-key hashes of a consolidated file.
+
+    The index is rebuilt from the file (once) when it is missing or was
+    written for a different file size, e.g. after an interrupted append or
+    a rewrite by another script.
+    """
+    path = key_index_path(consolidated_path)
+    if os.path.isfile(path):
+        with np.load(path) as index:
+            if int(index['size']) == os.path.getsize(consolidated_path):
+                return index['hashes']
+
+    print(f"Building the row-key index of '{consolidated_path}'...")
+    consolidated = pd.read_csv(consolidated_path, usecols=key_columns, dtype=str, keep_default_na=False)
+    hashes = np.unique(row_key_hashes(consolidated))
+    save_key_index(consolidated_path, hashes)
+    return hashes
+
+
+def append_new_rows(consolidated_path, new_csv_path):
+    """
+    Appends the rows of new_csv_path (first column removed) that are not yet
+    in consolidated_path, and records their keys in the hash index.
+
+    Only the new file is read, so rerunning the consolidation costs O(new rows)
+    and never duplicates sightings. If the consolidated file does not exist
+    yet, it is created from the new file.
+
+    Returns the number of rows appended.
+    """
+    df = pd.read_csv(new_csv_path, dtype=str, keep_default_na=False)
+
+    # Remove the first column
+    df = df.iloc[:, 1:]
+
+    if not os.path.isfile(consolidated_path):
+        hashes = row_key_hashes(df)
+        _, first = np.unique(hashes, return_index=True)
+        df = df.iloc[np.sort(first)]
+        df.to_csv(consolidated_path, index=False)
+        save_key_index(consolidated_path, np.unique(hashes))
+        print(f"Created '{consolidated_path}' with {len(df)} rows.")
+        return len(df)
+
+    existing = load_key_index(consolidated_path)
+    hashes = row_key_hashes(df)
+
+    # Keep rows whose key is unseen, and only the first of duplicates within the new file
+    unseen = ~np.isin(hashes, existing, assume_unique=False)
+    _, first = np.unique(hashes, return_index=True)
+    is_first = np.zeros(len(df), dtype=bool)
+    is_first[first] = True
+    keep = unseen & is_first
+    new_rows = df[keep]
+
+    if len(new_rows):
+        header = list(pd.read_csv(consolidated_path, nrows=0).columns)
+        new_rows = new_rows.reindex(columns=header)
+        with open(consolidated_path, 'a', newline='', encoding='utf-8') as f:
+            new_rows.to_csv(f, index=False, header=False)
+        save_key_index(consolidated_path, np.union1d(existing, hashes[keep]))
+    print(f"Appended {len(new_rows)} new rows to '{consolidated_path}' ({len(df) - len(new_rows)} already present).")
+    return len(new_rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Append only unseen sightings of a CSV to a consolidated sightings file.'
+    )
+    parser.add_argument('consolidated', nargs='?', default='full_larva_2024.csv', help='Consolidated CSV file.')
+    parser.add_argument(
+        'new_csv',
+        nargs='?',
+        default='./raw_spring/monarch_larva_first/monarch-larva-first_2024.csv',
+        help='CSV whose new rows are appended.'
+    )
+    args = parser.parse_args()
+
+    # Example usage
+    append_new_rows(args.consolidated, args.new_csv)
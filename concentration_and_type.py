@@ -1,34 +1,47 @@
 import pandas as pd
 import plotly.express as px
+from pdp_loader import load_pdp
+from pdp_cube import PDPCube
+from pdp_aggregate import concentration_counts, summarize_counts
+from pdp_groupby import group_stats
 
 # Step 1: Read and Preprocess the Data
-def process_pesticide_data(csv_file):
-    # Define column names based on your data structure
-    column_names = [
-        'SampleID', 'Type', 'PesticideCode', 'PesticideName', 'Category',
-        'Concentration', 'Limit', 'ResultQualifier', 'ResultQualifier2',
-        'Column9', 'Column10', 'Column11', 'Column12', 'Column13', 'Column14', 'Column15'
-    ]
-
-    # Read the CSV data
-    df = pd.read_csv(csv_file, names=column_names, header=None)
-
-    # Step 2: Extract State Information
-    df['State'] = df['SampleID'].str[:2]
-
-    # Convert concentration to numeric, coerce errors to NaN
-    df['Concentration'] = pd.to_numeric(df['Concentration'], errors='coerce')
-
-    # Drop rows with NaN concentration
-    df = df.dropna(subset=['Concentration'])
-
-    # Step 3: Aggregate Data per State
-    state_concentration = df.groupby('State')['Concentration'].median().reset_index()
-
-    # Step 4: Identify the Most Common Pesticide per State
-    pesticide_counts = df.groupby(['State', 'PesticideName']).size().reset_index(name='Counts')
-    idx = pesticide_counts.groupby('State')['Counts'].idxmax()
-    most_common_pesticide = pesticide_counts.loc[idx].reset_index(drop=True)
+def process_pesticide_data(csv_file, source='cube'):
+    # source: 'cube' (precomputed aggregates), 'stream' (chunked scan of the CSV) or 'memory' (load the rows)
+    if source not in ('cube', 'stream', 'memory'):
+        raise ValueError(f"Unknown source '{source}', expected 'cube', 'stream' or 'memory'.")
+    if source == 'cube':
+        # Per-state medians and per-pesticide counts from the precomputed aggregate cube
+        cube = PDPCube.open(csv_file)
+        state_concentration = cube.query(by=['State'], stats=['median'])
+        state_concentration = state_concentration.rename(columns={'median': 'Concentration'})
+        pesticide_counts = cube.query(by=['State', 'PesticideName'], stats=['count'])
+        pesticide_counts = pesticide_counts.rename(columns={'count': 'Counts'})
+    elif source == 'stream':
+        # One chunked scan: concentration histograms per state and pesticide give
+        # the exact per-state medians and the per-pesticide counts
+        counts = concentration_counts(csv_file, by=['State', 'PesticideName'])
+        state_concentration = summarize_counts(counts, by=['State'])[['State', 'median']]
+        state_concentration = state_concentration.rename(columns={'median': 'Concentration'})
+        pesticide_counts = summarize_counts(counts, by=['State', 'PesticideName'])[['State', 'PesticideName', 'count']]
+        pesticide_counts = pesticide_counts.rename(columns={'count': 'Counts'})
+    else:
+        # Read the PDP data (State and a numeric Concentration are derived by the loader);
+        # only aggregated, so the rows can stay in the store's order without a copy
+        df = load_pdp(csv_file, columns=['State', 'PesticideName', 'Concentration'], file_order=False)
+
+        # Steps 3 and 4: per-state median and most common pesticide in one pass
+        # (rows with NaN concentration are dropped by group_stats)
+        state_stats = group_stats(df, by='State', stats=['median', 'mode'], mode_column='PesticideName')
+        state_concentration = state_stats[['State', 'median']].rename(columns={'median': 'Concentration'})
+        most_common_pesticide = state_stats[['State', 'mode_PesticideName', 'mode_count']].rename(
+            columns={'mode_PesticideName': 'PesticideName', 'mode_count': 'Counts'}
+        )
+
+    if source != 'memory':
+        # Identify the Most Common Pesticide per State
+        idx = pesticide_counts.groupby('State', observed=True)['Counts'].idxmax()
+        most_common_pesticide = pesticide_counts.loc[idx].reset_index(drop=True)
 
     # Step 5: Determine Neonicotinoid Status
     neonicotinoids = [
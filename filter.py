@@ -1,17 +1,11 @@
-import pandas as pd
+from pdp_cube import PDPCube
 
-# Load the CSV data
-data = pd.read_csv('USDA_PDP_AnalyticalResults.csv')
+# Load the precomputed aggregates of the CSV data (built on the first run)
+cube = PDPCube.open('USDA_PDP_AnalyticalResults.csv')
 
-df = pd.DataFrame(data)
-
-# Extract state from the first two characters of the 'Sample ID'
-df['State'] = df['Sample ID'].str[:2]
-
-
-# Count the number of rows for each state
-state_counts = df['State'].value_counts()
+# Count the number of rows for each state (the state is the first two characters of the 'Sample ID')
+state_counts = cube.query(by=['State'], stats=['rows']).set_index('State')['rows']
+state_counts = state_counts.sort_values(ascending=False).rename('count')
 
 # Display the counts for each state
 print(state_counts)
-
@@ -1,26 +1,13 @@
-import pandas as pd
 import plotly.express as px
+from pdp_loader import load_pdp
+from pdp_cube import PDPCube
+from pdp_groupby import group_stats
 
 # Step 1: Read and Preprocess the Data
-def process_neonicotinoid_data(csv_file):
-    # Define column names based on your data structure
-    column_names = [
-        'SampleID', 'Type', 'PesticideCode', 'PesticideName', 'Category',
-        'Concentration', 'Limit', 'ResultQualifier', 'ResultQualifier2',
-        'Column9', 'Column10', 'Column11', 'Column12', 'Column13', 'Column14', 'Column15'
-    ]
-
-    # Read the CSV data
-    df = pd.read_csv(csv_file, names=column_names, header=None)
-
-    # Extract State Information
-    df['State'] = df['SampleID'].str[:2]
-
-    # Convert concentration to numeric, coerce errors to NaN
-    df['Concentration'] = pd.to_numeric(df['Concentration'], errors='coerce')
-
-    # Drop rows with NaN concentration
-    df = df.dropna(subset=['Concentration'])
+def process_neonicotinoid_data(csv_file, source='cube'):
+    # source: 'cube' (precomputed aggregates) or 'memory' (load the rows)
+    if source not in ('cube', 'memory'):
+        raise ValueError(f"Unknown source '{source}', expected 'cube' or 'memory'.")
 
     # Define neonicotinoid pesticides
     neonicotinoids = [
@@ -28,14 +15,29 @@ def process_neonicotinoid_data(csv_file):
         'Acetamiprid', 'Dinotefuran', 'Nitenpyram', 'Thiacloprid'
     ]
 
-    # Filter the DataFrame to include only neonicotinoid pesticides
-    df_neonic = df[df['PesticideName'].isin(neonicotinoids)]
+    if source == 'cube':
+        # The cube keeps the highest concentration of every cell and the row holding it
+        highest_neonic_per_state = PDPCube.open(csv_file).query(
+            by=['State'], stats=['max', 'argmax'], where={'PesticideName': neonicotinoids}
+        )
+        highest_neonic_per_state = highest_neonic_per_state.rename(
+            columns={'max': 'Concentration', 'argmax_PesticideName': 'PesticideName'}
+        )
+        return highest_neonic_per_state[['State', 'PesticideName', 'Concentration']]
+
+    # Read only the neonicotinoid rows, through the run index of the memory-mapped PDP cache
+    df_neonic = load_pdp(csv_file, columns=['State', 'PesticideName', 'Concentration'], pesticides=neonicotinoids)
 
-    # Step 2: Get the highest concentration neonicotinoid per state
-    highest_neonic_per_state = df_neonic.loc[df_neonic.groupby('State')['Concentration'].idxmax()]
+    # Step 2: Get the highest concentration neonicotinoid per state, with the
+    # pesticide of the first row reaching it (rows with NaN concentration are dropped)
+    highest_neonic_per_state = group_stats(
+        df_neonic, by='State', stats=['max', 'argmax'], argmax_fields=['PesticideName']
+    )
 
     # Extract state, concentration, and pesticide name
-    state_neonic_data = highest_neonic_per_state[['State', 'PesticideName', 'Concentration']]
+    state_neonic_data = highest_neonic_per_state.rename(
+        columns={'max': 'Concentration', 'argmax_PesticideName': 'PesticideName'}
+    )[['State', 'PesticideName', 'Concentration']]
 
     return state_neonic_data
 
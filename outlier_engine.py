@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Default directory of the cached keep-masks
+default_cache_dir = '.outlier_cache'
+
+# Default parameters of each outlier method
+methods = {
+    'iqr': {'k': 1.5},
+    'mad': {'threshold': 3.5},
+    'zscore': {'threshold': 3.0},
+    'pcap': {'lower': 0.01, 'upper': 0.99},
+}
+
+# Bumped whenever a method changes meaning, so stale masks are never reused
+mask_version = 1
+
+
+def parse_method(spec, default_column='Number'):
+    """
+    Parses a method spec of the form 'method[:name=value,...][@column]'.
+
+    The column is a CSV column or 'name=expression', where the expression is
+    evaluated with DataFrame.eval (e.g. 'zscore@log_number=log(Number + 1)').
+
+    Returns a dict with the method, its full parameters and the column.
+    """
+    spec, _, column = spec.partition('@')
+    method, _, params_text = spec.partition(':')
+    if method not in methods:
+        raise ValueError(f"Unknown outlier method '{method}', expected one of {sorted(methods)}.")
+    params = dict(methods[method])
+    for item in filter(None, params_text.split(',')):
+        name, _, value = item.partition('=')
+        if name not in params:
+            raise ValueError(f"Unknown parameter '{name}' for method '{method}', expected one of {sorted(params)}.")
+        params[name] = float(value)
+    return {'method': method, 'params': params, 'column': column or default_column}
+
+
+def method_label(method):
+    params = ','.join(f'{name}={value:g}' for name, value in sorted(method['params'].items()))
+    return f"{method['method']}:{params}@{method['column']}"
+
+
+def _quantile(sorted_values, q):
+    # Same linear interpolation as pandas' Series.quantile
+    n = len(sorted_values)
+    if n == 0:
+        return float('nan')
+    position = (n - 1) * q
+    lower_rank = int(np.floor(position))
+    upper_rank = min(lower_rank + 1, n - 1)
+    lower = sorted_values[lower_rank]
+    return float(lower + (sorted_values[upper_rank] - lower) * (position - lower_rank))
+
+
+class ColumnStats:
+    """
+    Every statistic the outlier methods need for one column, computed from
+    a single sorted copy of its non-NaN values.
+    """
+
+    def __init__(self, values):
+        self.values = values
+        valid = values[~np.isnan(values)]
+        self.sorted = np.sort(valid)
+        self.n = len(valid)
+        self.mean = float(valid.mean()) if self.n else float('nan')
+        self.std = float(valid.std(ddof=1)) if self.n > 1 else float('nan')
+        self.median = _quantile(self.sorted, 0.5)
+        deviations = np.abs(valid - self.median)
+        self.mad = float(np.median(deviations)) if self.n else float('nan')
+        self.mean_absolute_deviation = float(deviations.mean()) if self.n else float('nan')
+
+    def quantile(self, q):
+        return _quantile(self.sorted, q)
+
+    def keep_mask(self, method, params):
+        """
+        Returns the boolean keep-mask of one method (NaN values are never kept,
+        like the comparisons of remove_outliers).
+        """
+        x = self.values
+        if method == 'iqr':
+            Q1 = self.quantile(0.25)
+            Q3 = self.quantile(0.75)
+            IQR = Q3 - Q1
+            return (x >= Q1 - params['k'] * IQR) & (x <= Q3 + params['k'] * IQR)
+        if method == 'pcap':
+            return (x >= self.quantile(params['lower'])) & (x <= self.quantile(params['upper']))
+        if method == 'zscore':
+            if not self.std:
+                return x == self.mean
+            return np.abs(x - self.mean) / self.std <= params['threshold']
+        if method == 'mad':
+            # Modified z-score (Iglewicz and Hoaglin); when more than half of the
+            # values equal the median the MAD is 0 and the mean absolute
+            # deviation is used instead
+            if self.mad:
+                scores = 0.6745 * (x - self.median) / self.mad
+            elif self.mean_absolute_deviation:
+                scores = (x - self.median) / (1.253314 * self.mean_absolute_deviation)
+            else:
+                return x == self.median
+            return np.abs(scores) <= params['threshold']
+        raise ValueError(f"Unknown outlier method '{method}'.")
+
+
+class OutlierEngine:
+    """
+    Computes and caches outlier keep-masks of sighting CSV files.
+
+    Masks are stored bit-packed under cache_dir, keyed by the SHA-256 of the
+    input file and the method, parameters and column, so switching or
+    comparing methods reuses them instead of rescanning the CSV. The input
+    hash itself is remembered per (path, size, mtime), so a cache hit does
+    not read the CSV at all. All missing masks are computed from one read of
+    the columns they need.
+    """
+
+    def __init__(self, cache_dir=default_cache_dir):
+        self.cache_dir = cache_dir
+        self.scans = 0
+
+    def _hashes_path(self):
+        return os.path.join(self.cache_dir, 'inputs.json')
+
+    def input_hash(self, csv_file_path):
+        """
+        Returns the SHA-256 of a file, rehashing it only if its size or mtime changed.
+        """
+        path = os.path.abspath(csv_file_path)
+        stat = os.stat(path)
+        try:
+            with open(self._hashes_path(), 'r', encoding='utf-8') as f:
+                hashes = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            hashes = {}
+        entry = hashes.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        hashes[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{self._hashes_path()}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(hashes, f, indent=2)
+        os.replace(tmp_path, self._hashes_path())
+        return hashes[path]['sha256']
+
+    def _mask_path(self, input_hash, method):
+        key = json.dumps({'version': mask_version, 'method': method}, sort_keys=True)
+        key_hash = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, input_hash[:16], f"{method['method']}-{key_hash}.npz")
+
+    def _load_mask(self, path):
+        try:
+            with np.load(path) as cached:
+                return np.unpackbits(cached['bits'], count=int(cached['n'])).astype(bool)
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _save_mask(self, path, mask):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, bits=np.packbits(mask), n=np.int64(len(mask)))
+        os.replace(tmp_path, path)
+
+    def _scan(self, csv_file_path, columns):
+        """
+        Reads the CSV once and returns a float64 array per requested column.
+        """
+        self.scans += 1
+        expressions = {name: expr for name, _, expr in (c.partition('=') for c in columns) if expr}
+        if expressions:
+            df = pd.read_csv(csv_file_path)
+        else:
+            df = pd.read_csv(csv_file_path, usecols=sorted(set(columns)))
+        arrays = {}
+        for column in columns:
+            name, _, expr = column.partition('=')
+            values = df.eval(expr) if expr else df[name]
+            arrays[column] = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64')
+        return arrays
+
+    def masks(self, csv_file_path, method_specs):
+        """
+        Returns {label: keep-mask} for each method spec (see parse_method),
+        loading cached masks and computing the others in a single scan.
+        """
+        parsed = [parse_method(spec) if isinstance(spec, str) else spec for spec in method_specs]
+        input_hash = self.input_hash(csv_file_path)
+
+        masks = {}
+        missing = []
+        for method in parsed:
+            mask = self._load_mask(self._mask_path(input_hash, method))
+            if mask is None:
+                missing.append(method)
+            else:
+                masks[method_label(method)] = mask
+
+        if missing:
+            arrays = self._scan(csv_file_path, list(dict.fromkeys(m['column'] for m in missing)))
+            stats = {column: ColumnStats(values) for column, values in arrays.items()}
+            for method in missing:
+                mask = stats[method['column']].keep_mask(method['method'], method['params'])
+                self._save_mask(self._mask_path(input_hash, method), mask)
+                masks[method_label(method)] = mask
+
+        return {method_label(method): masks[method_label(method)] for method in parsed}
+
+
+def compare_masks(masks):
+    """
+    Returns a DataFrame with the rows kept and dropped by each method and,
+    for every pair, the number of rows on which the two methods disagree.
+    """
+    labels = list(masks)
+    summary = pd.DataFrame({
+        'kept': [int(masks[label].sum()) for label in labels],
+        'dropped': [int((~masks[label]).sum()) for label in labels],
+    }, index=labels)
+    for other in labels:
+        summary[f'disagree:{other}'] = [int((masks[label] != masks[other]).sum()) for label in labels]
+    return summary
+
+
+def apply_mask(csv_file_path, output_csv_file_path, keep, chunksize=100000):
+    """
+    Writes the rows of a CSV whose keep-mask entry is True, chunk by chunk.
+
+    Returns the number of rows written.
+    """
+    written = 0
+    start = 0
+    with open(output_csv_file_path, 'w', newline='', encoding='utf-8') as f:
+        for i, chunk in enumerate(pd.read_csv(csv_file_path, chunksize=chunksize)):
+            chunk_cleaned = chunk[keep[start:start + len(chunk)]]
+            chunk_cleaned.to_csv(f, index=False, header=(i == 0))
+            written += len(chunk_cleaned)
+            start += len(chunk)
+    if start != len(keep):
+        raise ValueError(f"Mask has {len(keep)} entries but '{csv_file_path}' has {start} rows.")
+    return written
@@ -1,10 +1,11 @@
-import pandas as pd
+from pdp_cube import PDPCube
 
-# Load the CSV data
-df = pd.read_csv('USDA_PDP_AnalyticalResults.csv')
+# Load the precomputed aggregates of the CSV data (built on the first run)
+cube = PDPCube.open('USDA_PDP_AnalyticalResults.csv')
 
 # Count the occurrences of each pesticide in the entire dataset
-pesticide_counts = df['Pesticide Name'].value_counts()
+pesticide_counts = cube.query(by=['PesticideName'], stats=['rows']).set_index('PesticideName')['rows']
+pesticide_counts = pesticide_counts.sort_values(ascending=False).rename('count')
 
 # Display the counts of each pesticide
 print(pesticide_counts)
@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+import glob
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:  # zstandard is only needed for zstd-compressed archives
+    zstandard = None
+
+# Default directory of the raw-HTML archive
+default_archive_dir = './page_archive'
+
+# File extension of each supported compression
+extensions = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _compress(content, compression):
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package.")
+        return zstandard.ZstdCompressor(level=10).compress(content)
+    return gzip.compress(content, compresslevel=6)
+
+
+def _decompress(blob, compression):
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package.")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+class PageArchive:
+    """
+    Content-addressed store of the raw querylist pages the scraper fetched.
+
+    Page bodies are stored once per SHA-256 under objects/, compressed with
+    gzip or zstd. A small JSON ref per (map, season, year) under refs/ points
+    at the latest body, so every CSV can be rebuilt locally without touching
+    the network.
+    """
+
+    def __init__(self, archive_dir=default_archive_dir, compression='gzip'):
+        if compression not in extensions:
+            raise ValueError(f"Unknown compression '{compression}', expected one of {sorted(extensions)}.")
+        self.archive_dir = archive_dir
+        self.compression = compression
+
+    def _object_path(self, digest, compression):
+        return os.path.join(self.archive_dir, 'objects', digest[:2], digest[2:] + extensions[compression])
+
+    def _ref_path(self, map, season, year):
+        return os.path.join(self.archive_dir, 'refs', map, season, f'{year}.json')
+
+    def _write_atomically(self, path, data, mode):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def store(self, map, season, year, content, encoding=None, output_dir=None):
+        """
+        Archives a page body and points the (map, season, year) ref at it.
+
+        Returns the SHA-256 of the body.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest, self.compression)
+        if not os.path.isfile(object_path):
+            self._write_atomically(object_path, _compress(content, self.compression), 'wb')
+        ref = {
+            'map': map,
+            'season': season,
+            'year': int(year),
+            'sha256': digest,
+            'compression': self.compression,
+            'encoding': encoding,
+            'output_dir': output_dir,
+            'archived_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        self._write_atomically(self._ref_path(map, season, year), json.dumps(ref), 'w')
+        return digest
+
+    def ref(self, map, season, year):
+        """
+        Returns the ref of one (map, season, year), or None if it was never archived.
+        """
+        try:
+            with open(self._ref_path(map, season, year), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def refs(self):
+        """
+        Returns every archived ref.
+        """
+        refs = []
+        for path in sorted(glob.glob(os.path.join(self.archive_dir, 'refs', '*', '*', '*.json'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                refs.append(json.load(f))
+        return refs
+
+    def load(self, ref):
+        """
+        Returns the decoded HTML text a ref points at.
+        """
+        with open(self._object_path(ref['sha256'], ref['compression']), 'rb') as f:
+            content = _decompress(f.read(), ref['compression'])
+        return content.decode(ref.get('encoding') or 'utf-8', errors='replace')
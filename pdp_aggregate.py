@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from pdp_loader import cache_chunksize, pdp_schema, read_pdp_csv
+
+# Chunk summaries merged together at a time, so the state stays small
+combine_every = 16
+
+
+def _combine(parts, by):
+    counts = pd.concat(parts, ignore_index=True)
+    return counts.groupby(list(by) + ['Concentration'], sort=True)['count'].sum().reset_index()
+
+
+def concentration_counts(csv_file, by=('State',), pesticides=None, chunksize=cache_chunksize):
+    """
+    Streams the PDP CSV and returns how often each Concentration value occurs
+    per group: a DataFrame with the by columns, 'Concentration' and 'count'.
+
+    Reported concentrations take a finite set of values, so this histogram
+    grows with the number of groups and distinct values, not with the file,
+    while still giving exact medians. Rows without a numeric concentration
+    are skipped, like the dropna of the pesticide scripts.
+
+    Parameters:
+    - csv_file (str): Path to USDA_PDP_AnalyticalResults.csv.
+    - by (list of str): Grouping columns of pdp_schema.
+    - pesticides (list of str): Only count these PesticideNames.
+    - chunksize (int): Rows parsed at a time.
+    """
+    parts = []
+    for chunk in read_pdp_csv(csv_file, chunksize=chunksize):
+        chunk = chunk.dropna(subset=['Concentration'])
+        if pesticides is not None:
+            chunk = chunk[chunk['PesticideName'].isin(pesticides)]
+        counts = chunk.groupby(list(by) + ['Concentration'], observed=True).size().reset_index(name='count')
+        # Plain strings, so summaries of chunks with different categories line up
+        for name in by:
+            counts[name] = counts[name].astype(str)
+        parts.append(counts)
+        if len(parts) >= combine_every:
+            parts = [_combine(parts, by)]
+    if not parts:
+        return pd.DataFrame(columns=list(by) + ['Concentration', 'count'])
+    return _combine(parts, by)
+
+
+def summarize_counts(counts, by=('State',)):
+    """
+    Turns concentration_counts (grouped by the same or finer columns) into
+    per-group statistics: count, mean, median and max of Concentration.
+
+    Medians interpolate like pandas' median, and the statistics have the
+    dtype of the in-memory column, so count, median and max equal a groupby
+    on the loaded data. The mean is accumulated in float64 and rounded once,
+    like a groupby on the float64 column; pandas' float32 groupby mean
+    accumulates in float32 and may differ from it in the last bit.
+    """
+    counts = _combine([counts], by)
+    dtype = pdp_schema['Concentration']
+    if counts.empty:
+        return pd.DataFrame({**{name: [] for name in by}, 'count': [], 'mean': [], 'median': [], 'max': []})
+
+    values = counts['Concentration'].to_numpy(dtype='float64')
+    weights = counts['count'].to_numpy(dtype='int64')
+
+    # Rows are sorted by group then value; find each group's slice
+    group = counts.groupby(list(by), sort=False).ngroup().to_numpy()
+    n = np.bincount(group, weights=weights).astype(np.int64)
+    last = np.flatnonzero(np.r_[group[1:] != group[:-1], True])
+    first = np.r_[0, last[:-1] + 1]
+    cumulative = np.cumsum(weights)
+    offset = cumulative[last] - n
+
+    def value_at_rank(rank):
+        # The value holding (0-based) rank r of its group
+        return values[np.searchsorted(cumulative, offset + rank, side='right')]
+
+    position = (n - 1) * 0.5
+    lower_rank = np.floor(position).astype(np.int64)
+    lower = value_at_rank(lower_rank)
+    upper = value_at_rank(np.minimum(lower_rank + 1, n - 1))
+    median = lower + (upper - lower) * (position - lower_rank)
+
+    summary = counts.iloc[first][list(by)].reset_index(drop=True)
+    summary['count'] = n
+    summary['mean'] = (np.bincount(group, weights=values * weights) / n).astype(dtype)
+    summary['median'] = median.astype(dtype)
+    summary['max'] = values[last].astype(dtype)
+    return summary
+
+
+def aggregate_pdp(csv_file, by=('State',), pesticides=None, chunksize=cache_chunksize):
+    """
+    Per-group count, mean, median and max of Concentration, computed from the
+    PDP CSV in chunks with memory independent of the file size.
+    """
+    return summarize_counts(concentration_counts(csv_file, by, pesticides, chunksize), by)
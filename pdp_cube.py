@@ -0,0 +1,195 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pdp_aggregate import summarize_counts
+from pdp_loader import cache_chunksize, default_cache_dir, pdp_schema, read_pdp_csv, source_hash
+
+# Dimensions of the cube
+cube_keys = ['State', 'PesticideName', 'Type', 'Year']
+
+# Statistics a query can ask for
+cube_stats = ['rows', 'count', 'sum', 'min', 'max', 'mean', 'median', 'argmax']
+
+# Bumped whenever the cube layout changes, so old cubes are rebuilt
+cube_version = 1
+
+# Chunk summaries merged together at a time while building
+combine_every = 16
+
+
+def _combine_cells(parts, by):
+    """
+    Merges cell summaries (from chunks or finer cells) over the by columns.
+    The argmax of a group is the row holding its largest max, the earliest
+    row on ties, like idxmax.
+    """
+    cells = pd.concat(parts, ignore_index=True)
+    grouped = cells.groupby(by, dropna=False, sort=True)
+    combined = grouped.agg(rows=('rows', 'sum'), count=('count', 'sum'), sum=('sum', 'sum'),
+                           min=('min', 'min'), max=('max', 'max')).reset_index()
+    winners = (cells.dropna(subset=['max'])
+               .sort_values(['max', 'argmax_row'], ascending=[False, True], kind='stable')
+               .drop_duplicates(subset=by, keep='first'))
+    argmax_columns = ['argmax_row', 'argmax_sample'] + [f'argmax_{key}' for key in cube_keys if key not in by]
+    winners = winners[by + [column for column in argmax_columns if column in winners.columns]]
+    return combined.merge(winners, on=by, how='left')
+
+
+def _chunk_cells(chunk):
+    """
+    Returns the cell summary and the concentration histogram of one chunk.
+    """
+    keys = chunk[cube_keys].astype(object)
+    keys['Year'] = chunk['Year'].astype('float64')
+    frame = keys.assign(Concentration=chunk['Concentration'], SampleID=chunk['SampleID'], row=chunk.index)
+
+    # Sums are accumulated in float64
+    grouped = frame.assign(value=chunk['Concentration'].astype('float64')).groupby(cube_keys, dropna=False, sort=False)
+    cells = grouped['value'].agg(['size', 'count', 'sum', 'min', 'max']).reset_index()
+    cells = cells.rename(columns={'size': 'rows'})
+
+    # The first row reaching each cell's maximum
+    valued = frame.dropna(subset=['Concentration'])
+    peak = valued.groupby(cube_keys, dropna=False, sort=False)['Concentration'].transform('max')
+    winners = valued[valued['Concentration'] == peak].drop_duplicates(subset=cube_keys, keep='first')
+    winners = winners[cube_keys + ['row', 'SampleID']].rename(columns={'row': 'argmax_row', 'SampleID': 'argmax_sample'})
+    cells = cells.merge(winners, on=cube_keys, how='left')
+
+    values = valued.groupby(cube_keys + ['Concentration'], dropna=False, sort=False).size().reset_index(name='count')
+    return cells, values
+
+
+class PDPCube:
+    """
+    Aggregate cube of the PDP results over (State, PesticideName, Type, Year).
+
+    Each cell holds the row count, the count, sum, min and max of the
+    numeric concentrations and the sample holding the max. A histogram of
+    the concentrations per cell (a mergeable, exact quantile summary) gives
+    medians for any roll-up. Both tables are Parquet files in the PDP cache
+    directory, keyed by the hash of the CSV, so queries never touch the raw
+    file after the first build.
+    """
+
+    def __init__(self, cells, values_path, values=None):
+        self.cells = cells
+        self.values_path = values_path
+        self._values = values
+
+    @staticmethod
+    def path(csv_file, cache_dir=default_cache_dir):
+        return os.path.join(cache_dir, f'cube-v{cube_version}-{source_hash(csv_file, cache_dir)[:16]}')
+
+    @classmethod
+    def build(cls, csv_file, cube_dir, chunksize=cache_chunksize):
+        """
+        Scans the PDP CSV in chunks and writes the cube to cube_dir.
+        """
+        print(f"Building the PDP aggregate cube of '{csv_file}' (first run only)...")
+        cell_parts = []
+        value_parts = []
+        offset = 0
+        for chunk in read_pdp_csv(csv_file, chunksize=chunksize, sample_ids=True):
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            cells, values = _chunk_cells(chunk)
+            cell_parts.append(cells)
+            value_parts.append(values)
+            if len(cell_parts) >= combine_every:
+                cell_parts = [_combine_cells(cell_parts, cube_keys)]
+                value_parts = [cls._combine_values(value_parts)]
+        cells = _combine_cells(cell_parts, cube_keys) if cell_parts else None
+        values = cls._combine_values(value_parts) if value_parts else None
+        if cells is None:
+            cells = pd.DataFrame(columns=cube_keys + ['rows', 'count', 'sum', 'min', 'max', 'argmax_row', 'argmax_sample'])
+            values = pd.DataFrame(columns=cube_keys + ['Concentration', 'count'])
+
+        tmp_dir = f'{cube_dir}.{os.getpid()}.tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
+        cells.to_parquet(os.path.join(tmp_dir, 'cells.parquet'), index=False)
+        values.to_parquet(os.path.join(tmp_dir, 'values.parquet'), index=False)
+        os.replace(tmp_dir, cube_dir)
+        return cls(cells, os.path.join(cube_dir, 'values.parquet'), values)
+
+    @staticmethod
+    def _combine_values(parts):
+        values = pd.concat(parts, ignore_index=True)
+        return values.groupby(cube_keys + ['Concentration'], dropna=False, sort=True)['count'].sum().reset_index()
+
+    @classmethod
+    def open(cls, csv_file, cache_dir=default_cache_dir):
+        """
+        Loads the cube of a PDP CSV, building it on first use. Only the cell
+        table is read; histograms are read by the queries that need them.
+        """
+        cube_dir = cls.path(csv_file, cache_dir)
+        if not os.path.isdir(cube_dir):
+            return cls.build(csv_file, cube_dir)
+        return cls(pd.read_parquet(os.path.join(cube_dir, 'cells.parquet')), os.path.join(cube_dir, 'values.parquet'))
+
+    def values(self, where=None):
+        """
+        Returns the concentration histograms, reading only the row groups
+        that can match where.
+        """
+        if self._values is not None:
+            return self._values
+        filters = [(column, 'in', list(allowed)) for column, allowed in (where or {}).items()]
+        return pd.read_parquet(self.values_path, filters=filters or None)
+
+    def _select(self, table, where, exclude):
+        mask = np.ones(len(table), dtype=bool)
+        for column, allowed in (where or {}).items():
+            mask &= table[column].isin(allowed).to_numpy()
+        for column, excluded in (exclude or {}).items():
+            mask &= ~table[column].isin(excluded).to_numpy()
+        return table[mask]
+
+    def query(self, by=('State',), stats=('count', 'mean', 'median', 'max'), where=None, exclude=None):
+        """
+        Rolls the cube up to the by columns.
+
+        Parameters:
+        - by (list of str): Any of cube_keys.
+        - stats (list of str): Any of cube_stats. 'rows' counts every row,
+          the others only rows with a numeric concentration (groups without
+          any are left out). 'argmax' adds the argmax_sample of each group
+          and the other cube keys of that row as argmax_<key>.
+        - where (dict): Keep rows whose column is in the given values.
+        - exclude (dict): Drop rows whose column is in the given values.
+
+        Statistics match a groupby on load_pdp data (see summarize_counts).
+        """
+        by = list(by)
+        unknown = set(stats) - set(cube_stats)
+        if unknown:
+            raise ValueError(f"Unknown statistics {sorted(unknown)}, expected some of {cube_stats}.")
+        dtype = pdp_schema['Concentration']
+
+        cells = self._select(self.cells, where, exclude)
+        cells = cells.assign(**{f'argmax_{key}': cells[key] for key in cube_keys if key not in by})
+        result = _combine_cells([cells], by)
+        result = result.dropna(subset=by)
+        if set(stats) - {'rows'}:
+            result = result[result['count'] > 0]
+
+        result['mean'] = (result['sum'] / result['count']).astype(dtype)
+        result['min'] = result['min'].astype(dtype)
+        result['max'] = result['max'].astype(dtype)
+        if 'median' in stats:
+            values = self._select(self.values(where), where, exclude)
+            medians = summarize_counts(values, by)[by + ['median']]
+            result = result.merge(medians, on=by, how='left')
+
+        columns = list(by)
+        for stat in stats:
+            if stat == 'argmax':
+                columns += ['argmax_sample'] + [f'argmax_{key}' for key in cube_keys if key not in by]
+            else:
+                columns.append(stat)
+        result = result[columns].reset_index(drop=True)
+        if 'Year' in by:
+            result['Year'] = result['Year'].astype('Int16')
+        return result
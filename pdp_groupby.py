@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+
+# Statistics group_stats can compute
+group_statistics = ['count', 'mean', 'median', 'max', 'argmax', 'mode']
+
+
+def group_stats(df, by, stats, value='Concentration', argmax_fields=(), mode_column=None):
+    """
+    Computes several per-group statistics of one value column in a single
+    factorize-and-scan pass, instead of one groupby per statistic plus merges.
+
+    The rows are factorized into group codes once. Counts, means and maxima
+    are reduced over those codes, and the first row reaching each max is
+    found in one comparison against the group maxima. Medians come from one
+    sort of the values by (group, value), which leaves every group a sorted
+    run (see _medians). The mode of mode_column comes from one count of
+    (group, item) pairs. Rows with a NaN value are dropped first, like the
+    dropna of the pesticide scripts.
+
+    Parameters:
+    - df (DataFrame): Rows to summarize.
+    - by (str or list of str): Grouping columns.
+    - stats (list of str): Any of group_statistics.
+        - 'count', 'mean', 'median', 'max': of the value column.
+        - 'argmax': the index label of the first row holding the max
+          ('argmax_row') and its argmax_fields ('argmax_<field>'), like
+          df.loc[groupby.idxmax()].
+        - 'mode': the most frequent mode_column item ('mode_<column>') and
+          its count ('mode_count'). Ties go to the first item in sort
+          order, like idxmax over groupby([by, column]).size().
+    - value (str): Column the statistics are computed on.
+    - argmax_fields (list of str): Columns reported for the argmax row.
+    - mode_column (str): Column whose most frequent item is reported.
+
+    Returns one row per group, sorted by the group keys like groupby.
+    Statistics keep the dtype of the value column.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    unknown = set(stats) - set(group_statistics)
+    if unknown:
+        raise ValueError(f"Unknown statistics {sorted(unknown)}, expected some of {group_statistics}.")
+    if 'mode' in stats and mode_column is None:
+        raise ValueError("The 'mode' statistic needs a mode_column.")
+
+    # Only the columns in use are filtered, however wide the frame is
+    used = list(dict.fromkeys(by + [value] + list(argmax_fields) + ([mode_column] if 'mode' in stats else [])))
+    df = df[used][df[value].notna()]
+    dtype = df[value].dtype
+
+    # Factorize the group keys once into dense codes, in groupby's sort order;
+    # rows with a missing key are left out like in groupby
+    codes, keys = _group_codes(df, by)
+    keep = codes >= 0
+    if not keep.all():
+        df = df[keep]
+        codes = codes[keep]
+    n_groups = len(keys)
+    values = df[value].to_numpy()
+
+    result = keys
+    counts = np.bincount(codes, minlength=n_groups)
+    if 'count' in stats:
+        result['count'] = counts
+    if 'mean' in stats:
+        result['mean'] = (np.bincount(codes, weights=values, minlength=n_groups) / counts).astype(dtype)
+
+    if 'median' in stats:
+        result['median'] = _medians(values, codes, counts).astype(dtype)
+
+    if {'max', 'argmax'} & set(stats):
+        maxima = np.full(n_groups, -np.inf, dtype=values.dtype)
+        np.maximum.at(maxima, codes, values)
+        if 'max' in stats:
+            result['max'] = maxima.astype(dtype)
+        if 'argmax' in stats:
+            # The first row of each group holding its max, like idxmax
+            at_max = np.flatnonzero(values == maxima[codes])
+            argmax_rows = np.full(n_groups, len(values))
+            np.minimum.at(argmax_rows, codes[at_max], at_max)
+            result['argmax_row'] = df.index[argmax_rows]
+            for field in argmax_fields:
+                result[f'argmax_{field}'] = df[field].iloc[argmax_rows].to_numpy()
+
+    if 'mode' in stats:
+        item_codes, items = _factorize(df[mode_column])
+        items = np.asarray(items, dtype=object)
+        pairs = codes.astype(np.int64) * len(items) + item_codes
+        pair_values, pair_counts, _ = _observed(pairs[item_codes >= 0], n_groups * len(items))
+        pair_groups = pair_values // len(items)
+        # Within each group, the first pair (lowest item) with the highest count
+        order = np.lexsort((pair_values, -pair_counts, pair_groups))
+        _, first = np.unique(pair_groups[order], return_index=True)
+        best = order[first]
+        mode_items = np.full(n_groups, None, dtype=object)
+        mode_counts = np.zeros(n_groups, dtype=np.int64)
+        mode_items[pair_groups[best]] = items[pair_values[best] % len(items)]
+        mode_counts[pair_groups[best]] = pair_counts[best]
+        result[f'mode_{mode_column}'] = mode_items
+        result['mode_count'] = mode_counts
+
+    return result
+
+
+def _factorize(column):
+    """
+    Returns (codes, items) with items in sort order: the categories of a
+    categorical, sorted values otherwise. Missing values get code -1.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy().astype(np.int64), column.cat.categories
+    codes, items = pd.factorize(column, sort=True)
+    return codes.astype(np.int64), pd.Index(items)
+
+
+def _group_codes(df, by):
+    """
+    Returns the dense group code of every row (-1 when a key is missing) and
+    a DataFrame of the observed groups' keys, in sort order.
+    """
+    codes = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    levels = []
+    for name in by:
+        column_codes, items = _factorize(df[name])
+        levels.append((name, df[name].dtype, items))
+        missing |= column_codes < 0
+        # Mixed-radix combination keeps the lexicographic order of the keys
+        codes = codes * len(items) + column_codes
+    size = int(np.prod([len(items) for _, _, items in levels]))
+    codes[missing] = -1
+    observed, _, codes[~missing] = _observed(codes[~missing], size)
+
+    keys = pd.DataFrame(index=pd.RangeIndex(len(observed)))
+    for name, dtype, items in reversed(levels):
+        level_codes = observed % len(items)
+        observed = observed // len(items)
+        if isinstance(dtype, pd.CategoricalDtype):
+            keys[name] = pd.Categorical.from_codes(level_codes, dtype=dtype)
+        else:
+            keys[name] = items.take(level_codes)
+    return codes, keys[by]
+
+
+def _medians(values, codes, counts):
+    """
+    Per-group medians, interpolated like pandas' median. The values are
+    sorted by (group, value) in one vectorized pass, so each group is a
+    sorted run whose middle ranks are read directly, for any number of groups.
+    """
+    n_groups = len(counts)
+    starts = np.cumsum(counts) - counts
+    position = (counts - 1) * 0.5
+    lower_rank = np.floor(position).astype(np.int64)
+    upper_rank = np.minimum(lower_rank + 1, counts - 1)
+
+    if values.dtype == np.float32:
+        # float32 (the PDP Concentration) fits beside the group code in one
+        # uint64 key: a single sort of the keys, without an argsort
+        sorted_values = _unpack_float32(np.sort(_pack_float32(codes, values)))
+    else:
+        order = np.argsort(values)
+        sorted_values = values[order[np.argsort(_small_int(codes, n_groups)[order], kind='stable')]]
+    lower = sorted_values[starts + lower_rank].astype('float64')
+    upper = sorted_values[starts + upper_rank].astype('float64')
+    return lower + (upper - lower) * (position - lower_rank)
+
+
+def _pack_float32(codes, values):
+    """
+    Returns uint64 keys that sort like (code, value): the code in the high
+    32 bits, the value's bits in the low 32 bits, flipped so that unsigned
+    order is numeric order (negative values get every bit flipped, others
+    the sign bit set). Values must not be NaN.
+    """
+    bits = values.view(np.uint32)
+    bits = np.where(bits >> np.uint32(31), ~bits, bits | np.uint32(1 << 31))
+    return (codes.astype(np.uint64) << np.uint64(32)) | bits.astype(np.uint64)
+
+
+def _unpack_float32(keys):
+    # Inverse of the value part of _pack_float32
+    bits = (keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    bits = np.where(bits >> np.uint32(31), bits & np.uint32(0x7FFFFFFF), ~bits)
+    return bits.view(np.float32)
+
+
+def _observed(codes, size):
+    """
+    Returns the sorted distinct values of codes (all in [0, size)), how
+    often each occurs, and the position of every code among them. Small
+    code ranges are counted directly instead of sorted.
+    """
+    if size <= max(len(codes), 1 << 16):
+        counts = np.bincount(codes, minlength=size)
+        observed = np.flatnonzero(counts)
+        return observed, counts[observed], (np.cumsum(counts > 0) - 1)[codes]
+    observed, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+    return observed, counts, inverse
+
+
+def _small_int(codes, n):
+    # numpy radix-sorts integers of 16 bits or less
+    return codes.astype(np.uint16) if n <= np.iinfo(np.uint16).max else codes
@@ -0,0 +1,423 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Columns of USDA_PDP_AnalyticalResults.csv, which has no header row
+column_names = [
+    'SampleID', 'Type', 'PesticideCode', 'PesticideName', 'Category',
+    'Concentration', 'Limit', 'ResultQualifier', 'ResultQualifier2',
+    'Column9', 'Column10', 'Column11', 'Column12', 'Column13', 'Column14', 'Column15'
+]
+
+# Declared in-memory schema of the columns the analysis scripts use. The
+# other raw columns (SampleID once State is derived, the result qualifiers
+# and Column9-Column15) are never read.
+pdp_schema = {
+    'Type': 'category',
+    'PesticideCode': 'category',
+    'PesticideName': 'category',
+    'Category': 'category',
+    'Concentration': 'float32',
+    'Limit': 'float32',
+    'State': 'category',
+    'Year': 'Int16',
+}
+
+# Raw columns read from the CSV to build pdp_schema (State and Year come from SampleID)
+used_columns = ['SampleID', 'Type', 'PesticideCode', 'PesticideName', 'Category', 'Concentration', 'Limit']
+
+# Dtypes given to read_csv: categories are built by the parser, numbers are
+# read as text and coerced afterwards so stray values become NaN
+read_dtypes = {
+    name: ('category' if pdp_schema.get(name) == 'category' else str)
+    for name in used_columns
+}
+
+# Default directory of the columnar caches
+default_cache_dir = '.pdp_cache'
+
+# Rows converted at a time when building a cache
+cache_chunksize = 1000000
+
+# Bumped whenever the cached representation changes, so old caches are rebuilt
+cache_version = 5
+
+# Columns with a run index in the store (rows are clustered by the first one)
+indexed_columns = ['PesticideName', 'PesticideCode']
+
+
+def sample_year(sample_ids):
+    """
+    Returns the year encoded in PDP sample IDs (the two digits after the
+    state code; PDP started in 1991), or <NA> when they are not digits.
+    """
+    yy = pd.to_numeric(sample_ids.str[2:4], errors='coerce')
+    return pd.Series(np.where(yy >= 90, 1900 + yy, 2000 + yy), index=sample_ids.index).astype('Int16')
+
+
+def has_header(csv_file):
+    # The published file starts with a 'Sample ID,...' header row; older extracts do not
+    with open(csv_file, 'r', encoding='utf-8', errors='replace') as f:
+        return f.readline().startswith('Sample ID')
+
+
+def _prepare(df, sample_ids=False):
+    """
+    Turns raw PDP rows (used_columns, read with read_dtypes) into pdp_schema,
+    keeping SampleID in front when sample_ids is True.
+    """
+    # Extract State and Year Information
+    df['State'] = df['SampleID'].str[:2].astype('category')
+    df['Year'] = sample_year(df['SampleID'])
+
+    # Convert concentration and limit to numeric, coerce errors to NaN
+    for name in ('Concentration', 'Limit'):
+        df[name] = pd.to_numeric(df[name], errors='coerce').astype(pdp_schema[name])
+    return df[(['SampleID'] if sample_ids else []) + list(pdp_schema)]
+
+
+def read_pdp_csv(csv_file, chunksize=None, sample_ids=False):
+    """
+    Reads the PDP CSV straight into pdp_schema, parsing only used_columns.
+    A header row, if the file has one, is skipped.
+
+    With chunksize, returns an iterator of DataFrames instead. Otherwise the
+    file is still parsed in chunks, so the raw SampleID strings of only one
+    chunk are ever in memory, and the chunks' categories are unioned.
+    """
+    reader = pd.read_csv(csv_file, names=column_names, header=None, usecols=used_columns,
+                         dtype=read_dtypes, skiprows=1 if has_header(csv_file) else None,
+                         chunksize=chunksize or cache_chunksize)
+    chunks = (_prepare(chunk, sample_ids) for chunk in reader)
+    if chunksize:
+        return chunks
+    chunks = list(chunks)
+    if not chunks:
+        empty = pd.DataFrame({name: pd.Series(dtype=read_dtypes[name]) for name in used_columns})
+        return _prepare(empty, sample_ids)
+    columns = {}
+    for name in chunks[0].columns:
+        if pdp_schema.get(name) == 'category':
+            columns[name] = union_categoricals([chunk[name] for chunk in chunks])
+        else:
+            columns[name] = pd.concat([chunk[name] for chunk in chunks], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def source_hash(csv_file, cache_dir=default_cache_dir):
+    """
+    Returns the SHA-256 of the PDP CSV. The hash is remembered per
+    (path, size, mtime), so an unchanged multi-GB file is hashed only once.
+    """
+    path = os.path.abspath(csv_file)
+    stat = os.stat(path)
+    sources_path = os.path.join(cache_dir, 'sources.json')
+    try:
+        with open(sources_path, 'r', encoding='utf-8') as f:
+            sources = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        sources = {}
+    entry = sources.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    sources[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{sources_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(sources, f, indent=2)
+    os.replace(tmp_path, sources_path)
+    return sources[path]['sha256']
+
+
+def _code_dtype(n_categories):
+    # Smallest signed integer holding every code and -1 for missing values
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _file_dtype(info):
+    # dtype of the raw file of a column described in meta.json
+    if info['dtype'] == 'category':
+        return np.dtype(info['codes'])
+    return np.dtype({'Int16': 'int16', 'Row': 'int64'}.get(info['dtype'], info['dtype']))
+
+
+def _map(path, dtype, rows, mode='r'):
+    # np.memmap cannot map an empty file
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=(rows,))
+
+
+def _runs(codes):
+    """
+    Returns {code: [[start, stop], ...]} of the runs of equal codes in a
+    clustered code column (missing codes are left out).
+    """
+    runs = {}
+    for first in range(0, len(codes), cache_chunksize):
+        chunk = np.asarray(codes[first:first + cache_chunksize])
+        boundaries = np.flatnonzero(np.diff(chunk)) + 1
+        for start, stop in zip(np.r_[0, boundaries], np.r_[boundaries, len(chunk)]):
+            code = int(chunk[start])
+            if code < 0:
+                continue
+            code_runs = runs.setdefault(code, [])
+            # A run cut by the chunk boundary continues the previous one
+            if code_runs and code_runs[-1][1] == first + start:
+                code_runs[-1][1] = first + int(stop)
+            else:
+                code_runs.append([first + int(start), first + int(stop)])
+    return runs
+
+
+class PDPStore:
+    """
+    Memory-mapped columnar store of the PDP results in pdp_schema, the
+    on-disk cache behind load_pdp.
+
+    Every column is a raw fixed-width array on disk: float32 numbers,
+    Int16 years with a mask of missing values, and the categorical text
+    columns as integer codes into a dictionary kept in meta.json. Opening
+    the store maps the files with np.memmap instead of reading them, so it
+    takes no time and no private memory; the OS pages data in as it is
+    touched, and processes opening the same store share those pages
+    through the page cache.
+
+    Rows are clustered by PesticideName (in file order within a pesticide),
+    with their original position in a 'Row' column and, in 'Position', the
+    store position of every file row, so file order is one gather away.
+    meta.json keeps the runs of rows of every PesticideName and
+    PesticideCode. A pesticide query reads only the runs it asks for.
+
+    The store lives in the cache directory, keyed by the hash of the CSV.
+    """
+
+    def __init__(self, store_dir, meta):
+        self.store_dir = store_dir
+        self.meta = meta
+        self.rows = meta['rows']
+
+    def __len__(self):
+        return self.rows
+
+    @staticmethod
+    def path(csv_file, cache_dir=default_cache_dir):
+        return os.path.join(cache_dir, f'pdp-v{cache_version}-{source_hash(csv_file, cache_dir)[:16]}')
+
+    @classmethod
+    def build(cls, csv_file, store_dir, chunksize=cache_chunksize):
+        """
+        Converts the PDP CSV to the store at store_dir, chunk by chunk so the
+        whole CSV never has to fit in memory.
+
+        A first pass writes the columns in file order, with category codes
+        as int32 while the dictionaries grow (each chunk's new categories
+        appended in order, as union_categoricals does in read_pdp_csv). A
+        second pass scatters every chunk to its place in PesticideName order
+        (a counting sort, so it is linear and stable) and narrows the codes
+        to the smallest width that fits.
+        """
+        print(f"Building the PDP cache of '{csv_file}' (first run only)...")
+        tmp_dir = f'{store_dir}.{os.getpid()}.tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
+        wide_dtypes = {name: np.dtype(np.int32) if dtype == 'category' else np.dtype({'Int16': 'int16'}.get(dtype, dtype))
+                       for name, dtype in pdp_schema.items()}
+        wide_dtypes['Year.mask'] = np.dtype(np.bool_)
+        files = {name: open(os.path.join(tmp_dir, f'{name}.wide'), 'wb') for name in wide_dtypes}
+        dictionaries = {name: {} for name, dtype in pdp_schema.items() if dtype == 'category'}
+        rows = 0
+        try:
+            for chunk in read_pdp_csv(csv_file, chunksize=chunksize):
+                rows += len(chunk)
+                for name, dtype in pdp_schema.items():
+                    column = chunk[name]
+                    if dtype == 'category':
+                        dictionary = dictionaries[name]
+                        # Chunk codes to store codes; the extra last entry keeps -1 for missing values
+                        mapping = np.array([dictionary.setdefault(category, len(dictionary))
+                                            for category in column.cat.categories] + [-1], dtype=np.int32)
+                        mapping[column.cat.codes.to_numpy()].tofile(files[name])
+                    elif dtype == 'Int16':
+                        column.to_numpy(dtype='int16', na_value=0).tofile(files[name])
+                        column.isna().to_numpy().tofile(files[f'{name}.mask'])
+                    else:
+                        column.to_numpy(dtype=dtype).tofile(files[name])
+        finally:
+            for f in files.values():
+                f.close()
+
+        columns = {}
+        for name, dtype in pdp_schema.items():
+            if dtype == 'category':
+                categories = list(dictionaries[name])
+                columns[name] = {'dtype': dtype, 'codes': _code_dtype(len(categories)).name, 'categories': categories}
+            else:
+                columns[name] = {'dtype': dtype}
+        columns['Row'] = {'dtype': 'Row'}
+        columns['Position'] = {'dtype': 'Row'}
+        final_dtypes = {name: _file_dtype(info) for name, info in columns.items()}
+        final_dtypes['Year.mask'] = np.dtype(np.bool_)
+
+        # Counting sort by PesticideName code (missing names first)
+        wide = {name: _map(os.path.join(tmp_dir, f'{name}.wide'), dtype, rows) for name, dtype in wide_dtypes.items()}
+        out = {name: _map(os.path.join(tmp_dir, f'{name}.bin'), dtype, rows, mode='w+')
+               for name, dtype in final_dtypes.items()}
+        n_keys = len(columns['PesticideName']['categories']) + 1
+        counts = np.zeros(n_keys, dtype=np.int64)
+        for start in range(0, rows, chunksize):
+            counts += np.bincount(wide['PesticideName'][start:start + chunksize] + 1, minlength=n_keys)
+        next_free = np.cumsum(counts) - counts
+        for start in range(0, rows, chunksize):
+            keys = np.asarray(wide['PesticideName'][start:start + chunksize]) + 1
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            key_counts = np.bincount(keys, minlength=n_keys)
+            # Place of every sorted row: the next free slot of its key plus its rank within the key
+            rank = np.arange(len(keys)) - (np.cumsum(key_counts) - key_counts)[sorted_keys]
+            destination = next_free[sorted_keys] + rank
+            next_free += key_counts
+            for name in wide_dtypes:
+                out[name][destination] = np.asarray(wide[name][start:start + chunksize])[order]
+            out['Row'][destination] = start + order
+            out['Position'][start + order] = destination
+        del wide
+        for array in out.values():
+            if isinstance(array, np.memmap):
+                array.flush()
+        for name in wide_dtypes:
+            os.remove(os.path.join(tmp_dir, f'{name}.wide'))
+
+        index = {}
+        for name in indexed_columns:
+            index[name] = {columns[name]['categories'][code]: runs
+                           for code, runs in _runs(out[name]).items()}
+        del out
+
+        meta = {'version': cache_version, 'rows': rows, 'columns': columns, 'index': index}
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        try:
+            os.replace(tmp_dir, store_dir)
+        except OSError:
+            # Another process finished the same store first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return cls(store_dir, meta)
+
+    @classmethod
+    def open(cls, csv_file, cache_dir=default_cache_dir):
+        """
+        Opens the store of a PDP CSV, building it on first use. Only
+        meta.json is read; the columns are mapped when asked for.
+        """
+        store_dir = cls.path(csv_file, cache_dir)
+        if not os.path.isdir(store_dir):
+            return cls.build(csv_file, store_dir)
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            return cls(store_dir, json.load(f))
+
+    def column(self, name):
+        """
+        Returns the raw mapped array of a column: the codes of a categorical
+        column, the values (0 where missing) of the Int16 Year, the original
+        row positions of 'Row', the store positions of the file rows of 'Position'.
+        """
+        return _map(os.path.join(self.store_dir, f'{name}.bin'), _file_dtype(self.meta['columns'][name]), self.rows)
+
+    def array(self, name):
+        """
+        Returns a column as a pandas array in pdp_schema, backed by the mapped files.
+        """
+        info = self.meta['columns'][name]
+        if info['dtype'] == 'category':
+            return pd.Categorical.from_codes(self.column(name), dtype=pd.CategoricalDtype(info['categories']))
+        if info['dtype'] == 'Int16':
+            mask = _map(os.path.join(self.store_dir, f'{name}.mask.bin'), np.bool_, self.rows)
+            return pd.arrays.IntegerArray(self.column(name), mask)
+        return self.column(name)
+
+    def matching_runs(self, column, values):
+        """
+        Returns the sorted (starts, stops) of the runs of rows whose indexed
+        column is in values.
+        """
+        index = self.meta['index'][column]
+        runs = sorted(run for value in {str(value) for value in values} for run in index.get(value, []))
+        runs = np.asarray(runs, dtype=np.int64).reshape(-1, 2)
+        return runs[:, 0], runs[:, 1]
+
+    def frame(self, columns=None, pesticides=None, pesticide_codes=None, file_order=True):
+        """
+        Returns the store as a DataFrame in pdp_schema, rows in file order.
+
+        Parameters:
+        - columns (list of str): Columns to return (all of them when None).
+        - pesticides (list of str): Only return rows of these PesticideNames.
+        - pesticide_codes (list): Only return rows of these PesticideCodes.
+        - file_order (bool): Without a filter, False returns the rows grouped
+          by PesticideName instead, as read-only views of the mapped files
+          with no data copied. For callers that only aggregate.
+
+        With a filter, only the matching runs are read; the number of rows
+        read is left in attrs['rows_read'].
+        """
+        columns = list(columns or pdp_schema)
+        if pesticides is None and pesticide_codes is None:
+            if file_order:
+                positions = self.column('Position')
+                return pd.DataFrame({name: self.array(name).take(positions) for name in columns})
+            return pd.DataFrame({name: self.array(name) for name in columns}, copy=False)
+
+        column, values = ('PesticideName', pesticides) if pesticides is not None else ('PesticideCode', pesticide_codes)
+        starts, stops = self.matching_runs(column, values)
+        positions = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)] or [[]]).astype(np.int64)
+        rows_read = len(positions)
+        if pesticides is not None and pesticide_codes is not None:
+            codes = self.column('PesticideCode')[positions]
+            categories = np.asarray(self.meta['columns']['PesticideCode']['categories'], dtype=object)
+            wanted = np.flatnonzero(np.isin(categories, [str(code) for code in pesticide_codes]))
+            positions = positions[np.isin(codes, wanted)]
+        # Back to file order
+        positions = positions[np.argsort(self.column('Row')[positions], kind='stable')]
+
+        df = pd.DataFrame({name: self.array(name).take(positions) for name in columns})
+        df.attrs['rows_read'] = rows_read
+        return df
+
+
+def load_pdp(csv_file, columns=None, cache_dir=default_cache_dir, pesticides=None, pesticide_codes=None,
+             file_order=True):
+    """
+    Loads the USDA PDP analytical results in the compact pdp_schema: the
+    derived 'State', categorical text columns and float32 'Concentration'
+    and 'Limit' (unparseable values become NaN).
+
+    The first call writes a memory-mapped PDPStore keyed by the hash of the
+    CSV; later calls map it, which is near-instant and shares the pages
+    with every other process reading the same store. A changed CSV gets a
+    new store.
+
+    Parameters:
+    - csv_file (str): Path to USDA_PDP_AnalyticalResults.csv.
+    - columns (list of str): Columns to return (all of them when None).
+    - cache_dir (str): Directory of the stores.
+    - pesticides (list of str): Only return rows of these PesticideNames,
+      read through the run index of the store rather than by scanning every row.
+    - pesticide_codes (list): Only return rows of these PesticideCodes.
+    - file_order (bool): Rows come in file order, like pd.read_csv. Without
+      a filter, False returns a zero-copy read-only view of the store with
+      rows grouped by PesticideName, for callers that only aggregate.
+    """
+    return PDPStore.open(csv_file, cache_dir).frame(columns, pesticides, pesticide_codes, file_order)
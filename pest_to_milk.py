@@ -1,26 +1,13 @@
 import pandas as pd
 import plotly.express as px
+from pdp_loader import load_pdp
+from pdp_cube import PDPCube
 
 # Step 1: Read and Preprocess the Neonicotinoid Data
-def process_neonicotinoid_data(csv_file):
-    # Define column names based on your data structure
-    column_names = [
-        'SampleID', 'Type', 'PesticideCode', 'PesticideName', 'Category',
-        'Concentration', 'Limit', 'ResultQualifier', 'ResultQualifier2',
-        'Column9', 'Column10', 'Column11', 'Column12', 'Column13', 'Column14', 'Column15'
-    ]
-
-    # Read the CSV data
-    df = pd.read_csv(csv_file, names=column_names, header=None)
-
-    # Extract State Information
-    df['State'] = df['SampleID'].str[:2]
-
-    # Convert concentration to numeric, coerce errors to NaN
-    df['Concentration'] = pd.to_numeric(df['Concentration'], errors='coerce')
-
-    # Drop rows with NaN concentration
-    df = df.dropna(subset=['Concentration'])
+def process_neonicotinoid_data(csv_file, source='cube'):
+    # source: 'cube' (precomputed aggregates) or 'memory' (load the rows)
+    if source not in ('cube', 'memory'):
+        raise ValueError(f"Unknown source '{source}', expected 'cube' or 'memory'.")
 
     # Define neonicotinoid pesticides
     neonicotinoids = [
@@ -28,11 +15,21 @@ def process_neonicotinoid_data(csv_file):
         'Acetamiprid', 'Dinotefuran', 'Nitenpyram', 'Thiacloprid'
     ]
 
-    # Filter the DataFrame to include only neonicotinoid pesticides
-    df_neonic = df[df['PesticideName'].isin(neonicotinoids)]
+    if source == 'cube':
+        # Answer from the precomputed aggregate cube instead of scanning the rows
+        state_neonic_concentration = PDPCube.open(csv_file).query(
+            by=['State'], stats=['mean'], where={'PesticideName': neonicotinoids}
+        )
+        return state_neonic_concentration.rename(columns={'mean': 'Concentration'})
+
+    # Read only the neonicotinoid rows, through the run index of the memory-mapped PDP cache
+    df_neonic = load_pdp(csv_file, columns=['State', 'PesticideName', 'Concentration'], pesticides=neonicotinoids)
+
+    # Drop rows with NaN concentration
+    df_neonic = df_neonic.dropna(subset=['Concentration'])
 
     # Aggregate Neonicotinoid Data per State (using median concentration)
-    state_neonic_concentration = df_neonic.groupby('State')['Concentration'].mean().reset_index()
+    state_neonic_concentration = df_neonic.groupby('State', observed=True)['Concentration'].mean().reset_index()
 
     return state_neonic_concentration
 
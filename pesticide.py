@@ -1,16 +1,11 @@
-import pandas as pd
+from pdp_cube import PDPCube
 
-# Load the full dataset
-df = pd.read_csv('USDA_PDP_AnalyticalResults.csv')  # Replace with your actual CSV file path
-# Extract state information from the 'Sample ID' (first two letters)
-df['State'] = df['Sample ID'].str[:2]
+# Load the precomputed aggregates of the full dataset (built on the first run)
+cube = PDPCube.open('USDA_PDP_AnalyticalResults.csv')  # Replace with your actual CSV file path
 
-# Filter the dataset to only include California (CA)
-ca_data = df[df['State']]
-
-# Count the occurrences of each pesticide in California
-pesticide_counts = ca_data['Pesticide Name'].value_counts()
+# Count the occurrences of each pesticide in California (CA), the state being the first two letters of the 'Sample ID'
+ca_counts = cube.query(by=['PesticideName'], stats=['rows'], where={'State': ['CA']})
+pesticide_counts = ca_counts.set_index('PesticideName')['rows'].sort_values(ascending=False).rename('count')
 
 # Display the counts of each pesticide
 print(pesticide_counts)
-
@@ -1,23 +1,27 @@
 import pandas as pd
 import plotly.express as px
+from pdp_loader import load_pdp
+from pdp_cube import PDPCube
+from pdp_aggregate import aggregate_pdp
 
 # Step 1: Read and Preprocess the Pesticide Data
-def process_pesticide_data(csv_file):
-    # Define column names based on your data structure
-    column_names = [
-        'SampleID', 'Type', 'PesticideCode', 'PesticideName', 'Category',
-        'Concentration', 'Limit', 'ResultQualifier', 'ResultQualifier2',
-        'Column9', 'Column10', 'Column11', 'Column12', 'Column13', 'Column14', 'Column15'
-    ]
-
-    # Read the CSV data
-    df = pd.read_csv(csv_file, names=column_names, header=None, low_memory=False)
-
-    # Extract State Information
-    df['State'] = df['SampleID'].str[:2]
-
-    # Convert concentration to numeric, coerce errors to NaN
-    df['Concentration'] = pd.to_numeric(df['Concentration'], errors='coerce')
+def process_pesticide_data(csv_file, source='cube'):
+    # source: 'cube' (precomputed aggregates), 'stream' (chunked scan of the CSV) or 'memory' (load the rows)
+    if source not in ('cube', 'stream', 'memory'):
+        raise ValueError(f"Unknown source '{source}', expected 'cube', 'stream' or 'memory'.")
+    if source == 'cube':
+        # Per-state medians from the precomputed aggregate cube
+        state_pesticide_concentration = PDPCube.open(csv_file).query(by=['State'], stats=['median'])
+        return state_pesticide_concentration.rename(columns={'median': 'Concentration'})
+
+    if source == 'stream':
+        # Exact per-state medians from a chunked scan, without loading the whole file
+        state_pesticide_concentration = aggregate_pdp(csv_file, by=['State'])[['State', 'median']]
+        return state_pesticide_concentration.rename(columns={'median': 'Concentration'})
+
+    # Read the PDP data (State and a numeric Concentration are derived by the loader);
+    # only medians are taken, so the rows can stay in the store's order without a copy
+    df = load_pdp(csv_file, columns=['State', 'Concentration'], file_order=False)
 
     # Drop rows with NaN concentration
     df = df.dropna(subset=['Concentration'])
@@ -27,7 +31,7 @@ def process_pesticide_data(csv_file):
     # df = df[df['State'] != 'NH']
 
     # Aggregate Pesticide Data per State (using median concentration)
-    state_pesticide_concentration = df.groupby('State')['Concentration'].median().reset_index()
+    state_pesticide_concentration = df.groupby('State', observed=True)['Concentration'].median().reset_index()
 
     return state_pesticide_concentration
 
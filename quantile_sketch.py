@@ -0,0 +1,154 @@
+import numpy as np
+
+
+def _interpolate(values, weights, q):
+    """
+    Returns the q-quantile of weighted sorted values using the same linear
+    interpolation as pandas' Series.quantile: the position (n - 1) * q falls
+    between two ranks, and the result interpolates their values.
+    """
+    n = weights.sum()
+    if n == 0:
+        return float('nan')
+    position = (n - 1) * q
+    lower_rank = np.floor(position)
+    fraction = position - lower_rank
+    cumulative = np.cumsum(weights)
+    # The value holding rank r (0-based) is the first whose cumulative weight exceeds r
+    lower = values[np.searchsorted(cumulative, lower_rank, side='right')]
+    upper_index = np.searchsorted(cumulative, min(lower_rank + 1, n - 1), side='right')
+    upper = values[upper_index]
+    return float(lower + (upper - lower) * fraction)
+
+
+class ExactHistogram:
+    """
+    Exact, mergeable quantile summary: a count per distinct value.
+
+    Sighting counts and reported concentrations take few distinct values, so
+    the histogram stays small while the quantiles equal the in-memory ones.
+    """
+
+    def __init__(self):
+        self.values = np.empty(0, dtype=np.float64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def _add(self, values, counts):
+        values = np.concatenate([self.values, values])
+        counts = np.concatenate([self.counts, counts])
+        self.values, inverse = np.unique(values, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts, minlength=len(self.values)).astype(np.int64)
+
+    def update(self, values):
+        """
+        Adds an array of values (NaNs are ignored).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            unique, counts = np.unique(values, return_counts=True)
+            self._add(unique, counts)
+        return self
+
+    def merge(self, other):
+        self._add(other.values, other.counts)
+        return self
+
+    def quantile(self, q):
+        return _interpolate(self.values, self.counts, q)
+
+    def to_dict(self):
+        return {'kind': 'exact', 'values': self.values.tolist(), 'counts': self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        sketch.values = np.asarray(data['values'], dtype=np.float64)
+        sketch.counts = np.asarray(data['counts'], dtype=np.int64)
+        return sketch
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch with bounded memory, for columns with too many
+    distinct values for an exact histogram.
+
+    Level h holds items of weight 2**h. When a level overflows its capacity
+    it is sorted and every other item (from a random offset) is promoted to
+    the next level. The rank error is about 1.7 / k with high probability.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.n = 0
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(self.levels[level])
+                # An odd item out stays on this level
+                keep = items[:1] if len(items) % 2 else items[:0]
+                items = items[len(keep):]
+                promoted = items[self.rng.integers(0, 2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    def update(self, values):
+        """
+        Adds an array of values (NaNs are ignored).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        for start in range(0, len(values), self.k):
+            batch = values[start:start + self.k]
+            self.levels[0] = np.concatenate([self.levels[0], batch])
+            self.n += len(batch)
+            self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return _interpolate(values[order], weights[order], q)
+
+    def to_dict(self):
+        return {'kind': 'kll', 'k': self.k, 'n': self.n, 'levels': [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(k=data['k'])
+        sketch.n = data['n']
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in data['levels']]
+        return sketch
+
+
+# Sketch classes selectable by name
+sketches = {'exact': ExactHistogram, 'kll': KLLSketch}
+
+
+def sketch_from_dict(data):
+    return sketches[data['kind']].from_dict(data)
@@ -0,0 +1,232 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+
+# Default directory of recorded querylist pages, laid out as {map}/{season}/{year}.html
+default_recordings_dir = './recordings'
+
+
+def make_querylist_html(n_rows, year=2024):
+    """
+    Builds a synthetic querylist page with n_rows sightings.
+
+    The rows mix the cell shapes seen on Journey North: linked and plain
+    dates, entities and nested markup in towns, spacer.gif, real photos and
+    empty image cells, plus a spacer row without 8 cells.
+    """
+    rows = []
+    for i in range(n_rows, 0, -1):
+        if i % 3:
+            image = '<img src="/images/spacer.gif" width="1">'
+        elif i % 2:
+            image = f'<a href="/sightings/photo{i}.html"><img src="/images/photos/{i}.jpg"></a>'
+        else:
+            image = ''
+        day = f'{(i // 28) % 12 + 1:02d}/{i % 28 + 1:02d}/{year}'
+        date = f'<a href="/sightings/{i}.html">{day}</a>' if i % 5 else f' {day} '
+        town = f'<b>Town</b> &amp; <!-- note -->County {i}' if i % 7 == 0 else f' Town {i} '
+        rows.append(
+            f'<tr><td>{i}</td><td>{date}</td><td>{town}</td><td>TX</td>'
+            f'<td>{30 + i / 1000:.3f}</td><td>-97.{i}</td><td>{i % 50}</td><td>{image}</td></tr>'
+        )
+        if i % 100 == 0:
+            rows.append('<tr><td colspan="8">&nbsp;</td></tr>')
+    return (
+        '<html><head><title>Sightings</title></head><body>'
+        '<table id="querylist"><thead><tr><th>#</th><th>Date</th></tr></thead><tbody>\n'
+        + '\n'.join(rows)
+        + '\n</tbody></table></body></html>'
+    )
+
+
+def recording_path(recordings_dir, map, season, year):
+    """
+    Returns the path of the recorded page for one map/season/year.
+    """
+    return os.path.join(recordings_dir, map, season, f'{year}.html')
+
+
+def record(map, season, years, recordings_dir=default_recordings_dir):
+    """
+    Downloads the live querylist pages once and saves them as recordings.
+    """
+    from scraper import fetch_year, make_session
+
+    session = make_session()
+    for year in years:
+        response = fetch_year(session, map, season, year)
+        if response.status_code != 200:
+            print(f"Failed to record {map} {year}. Status code: {response.status_code}")
+            continue
+        path = recording_path(recordings_dir, map, season, year)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        print(f"Recorded {map} {year} to {path}")
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """
+    Serves recorded querylist pages by (map, season, year).
+
+    The server settings (recordings, latency, error rate, synthetic rows) live
+    on the server object so every handler thread sees the same configuration.
+    """
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if not url.path.endswith('querylist.html'):
+            self.send_error(404)
+            return
+
+        query = parse_qs(url.query)
+        map = query.get('map', [''])[0]
+        season = query.get('season', [''])[0]
+        year = query.get('year', [''])[0]
+
+        # Simulated network latency with uniform jitter
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        # Error injection
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_error(random.choice([500, 502, 503]))
+            return
+
+        body = server.page(map, season, year)
+        if body is None:
+            self.send_error(404)
+            return
+
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Local stand-in for journeynorth.org/sightings/querylist.html.
+
+    Parameters:
+    - port (int): Port to listen on (0 picks a free one).
+    - recordings_dir (str): Directory of recorded pages.
+    - latency (float): Fixed delay per response in seconds.
+    - jitter (float): Extra uniform random delay per response in seconds.
+    - error_rate (float): Fraction of requests answered with a 5xx error.
+    - synthetic_rows (int): Rows of the synthetic page served when no recording
+      exists (0 answers 404 instead).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, recordings_dir=default_recordings_dir, latency=0.0, jitter=0.0,
+                 error_rate=0.0, synthetic_rows=0, verbose=False):
+        super().__init__(('127.0.0.1', port), ReplayHandler)
+        self.recordings_dir = recordings_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.synthetic_rows = synthetic_rows
+        self.verbose = verbose
+        self.pages = {}
+        self.pages_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/sightings/querylist.html'
+
+    def page(self, map, season, year):
+        key = (map, season, year)
+        with self.pages_lock:
+            if key in self.pages:
+                return self.pages[key]
+        body = None
+        path = recording_path(self.recordings_dir, map, season, year)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                body = f.read()
+        elif self.synthetic_rows and year.isdigit():
+            body = make_querylist_html(self.synthetic_rows, int(year)).encode('utf-8')
+        with self.pages_lock:
+            self.pages[key] = body
+        return body
+
+    def start(self):
+        """
+        Serves requests on a background thread and returns the server.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve recorded Journey North querylist pages for offline scraping and benchmarks.'
+    )
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on.')
+    parser.add_argument('--recordings-dir', default=default_recordings_dir, help='Directory of recorded pages.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fixed delay per response in seconds.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay per response in seconds.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 5xx error.')
+    parser.add_argument(
+        '--synthetic-rows',
+        type=int,
+        default=0,
+        help='Serve a synthetic page with this many rows when no recording exists.'
+    )
+    parser.add_argument(
+        '--record',
+        metavar='MAP:SEASON:START-END',
+        help='Record live pages into the recordings directory instead of serving.'
+    )
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every request.')
+    args = parser.parse_args()
+
+    if args.record:
+        from scraper import parse_job
+        job = parse_job(args.record)
+        record(job['map'], job['season'], job['years'], args.recordings_dir)
+        return
+
+    server = ReplayServer(
+        port=args.port,
+        recordings_dir=args.recordings_dir,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        synthetic_rows=args.synthetic_rows,
+        verbose=args.verbose
+    )
+    print(f"Replaying querylist pages at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+
+# Default directory holding one cache entry per (map, season, year)
+default_cache_dir = '.scrape_cache'
+
+
+def body_hash(content):
+    """
+    Returns the SHA-256 hex digest of a response body (bytes).
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of querylist responses keyed by (map, season, year).
+
+    Each entry is a small JSON file holding the ETag and Last-Modified
+    validators the server sent plus a hash of the body, so a rerun can send
+    a conditional request and skip parsing when nothing changed.
+    """
+
+    def __init__(self, cache_dir=default_cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, map, season, year):
+        return os.path.join(self.cache_dir, f'{map}_{season}_{year}.json')
+
+    def get(self, map, season, year):
+        """
+        Returns the stored entry for a key, or None if there is none.
+        """
+        try:
+            with open(self._path(map, season, year), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, map, season, year, response, digest):
+        """
+        Stores the validators of a 200 response together with its body hash.
+        """
+        entry = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': digest,
+        }
+        path = self._path(map, season, year)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def conditional_headers(self, entry):
+        """
+        Builds the If-None-Match/If-Modified-Since headers for a stored entry.
+        """
+        conditional = {}
+        if entry:
+            if entry.get('etag'):
+                conditional['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                conditional['If-Modified-Since'] = entry['last_modified']
+        return conditional
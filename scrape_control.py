@@ -0,0 +1,143 @@
+import json
+import os
+import random
+import threading
+import time
+
+# Default path of the persistent queue of years that could not be scraped
+default_retry_queue_path = '.scrape_retry.json'
+
+# Status codes worth retrying: rate limiting and transient server errors
+retryable_status_codes = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """
+    Returns a jittered exponential backoff delay in seconds ("full jitter":
+    uniform between 0 and min(cap, base * 2**attempt)).
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveController:
+    """
+    AIMD limiter for the number of requests in flight.
+
+    Every successful, fast response adds 1/limit to the limit, so it grows by
+    about one per round of requests (additive increase). An error or a
+    response slower than the latency target halves it (multiplicative
+    decrease), at most once per cooldown so one burst of failures counts as
+    a single congestion signal.
+
+    Parameters:
+    - initial (int): Starting number of requests in flight.
+    - max_limit (int): Upper bound, normally the number of fetch threads.
+    - min_limit (int): Lower bound.
+    - latency_target (float): Responses slower than this (seconds) count as congestion.
+    - cooldown (float): Minimum seconds between two decreases.
+    """
+
+    def __init__(self, initial=2, max_limit=8, min_limit=1, latency_target=5.0, cooldown=2.0):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.errors = 0
+        self.peak_limit = self.limit
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Blocks until another request may be started.
+        """
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, ok):
+        """
+        Records the outcome of a finished request and adjusts the limit.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            if ok and latency <= self.latency_target:
+                self.successes += 1
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self.peak_limit = max(self.peak_limit, self.limit)
+            else:
+                if not ok:
+                    self.errors += 1
+                now = time.monotonic()
+                if now - self.last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.last_decrease = now
+            self.condition.notify_all()
+
+    def summary(self):
+        return (f"limit {self.limit:.1f} (peak {self.peak_limit:.1f}), "
+                f"{self.successes} fast responses, {self.errors} errors")
+
+
+class RetryQueue:
+    """
+    Persistent list of (map, season, year) entries that failed after all
+    retries, so a later run can pick them up instead of losing those years.
+    """
+
+    def __init__(self, path=default_retry_queue_path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = []
+
+    def _key(self, map, season, year):
+        return (map, season, int(year))
+
+    def add(self, map, season, year, output_dir, reason):
+        with self.lock:
+            for entry in self.entries:
+                if self._key(entry['map'], entry['season'], entry['year']) == self._key(map, season, year):
+                    entry['attempts'] = entry.get('attempts', 1) + 1
+                    entry['reason'] = reason
+                    entry['output_dir'] = output_dir
+                    return
+            self.entries.append({
+                'map': map, 'season': season, 'year': int(year),
+                'output_dir': output_dir, 'attempts': 1, 'reason': reason,
+            })
+
+    def remove(self, map, season, year):
+        with self.lock:
+            key = self._key(map, season, year)
+            self.entries = [
+                entry for entry in self.entries
+                if self._key(entry['map'], entry['season'], entry['year']) != key
+            ]
+
+    def jobs(self):
+        """
+        Groups the queued years into scraper jobs.
+        """
+        grouped = {}
+        for entry in self.entries:
+            key = (entry['map'], entry['season'], entry.get('output_dir', '.'))
+            grouped.setdefault(key, []).append(entry['year'])
+        return [
+            {'map': map, 'season': season, 'years': sorted(years, reverse=True), 'output_dir': output_dir}
+            for (map, season, output_dir), years in grouped.items()
+        ]
+
+    def save(self):
+        with self.lock:
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
@@ -1,112 +1,1149 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from page_archive import PageArchive
+from scrape_cache import ResponseCache, body_hash, default_cache_dir
+from scrape_control import (
+    AdaptiveController, RetryQueue, backoff_delay, default_retry_queue_path, retryable_status_codes
+)
+from sightings_dataset import (
+    append_partition, default_dataset_dir, partition_high_water_mark, partition_path, write_partition
+)
+import argparse
 import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # lxml is only needed for the 'lxml' parser backend and streaming
+    etree = None
+    lxml_html = None
 
 # Base URL components
 base_url = 'https://journeynorth.org/sightings/querylist.html'
-map = 'monarch-larva-spring'
-params = {
-    'season': 'spring',
-    'map': map,
-    'year': '',  # We'll fill this in the loop
-    'submit': 'View Data'
-}
 
-# Years to scrape
+# Column headers written to every yearly CSV file
+headers = ["Index", "Date", "Town", "State/Province", "Latitude", "Longitude", "Number", "Image"]
+
+# Default map, season and years to scrape
+default_map = 'monarch-larva-spring'
+default_season = 'spring'
 start_year = 2024
 end_year = 1997
 
-# Loop over the years from 2024 to 1997
-for year in range(start_year, end_year - 1, -1):
-    print(f"Scraping data for year {year}...")
-    params['year'] = str(year)
+
+def make_session(pool_size=10):
+    """
+    Creates a requests Session whose connection pool keeps enough keep-alive
+    connections open for the given number of concurrent fetches.
+
+    Parameters:
+    - pool_size (int): Maximum number of pooled connections to the host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_year(session, map, season, year, request_headers=None, stream=False):
+    """
+    Downloads the querylist page of one map/season/year.
+
+    Returns the response object; callers check the status code. Extra
+    request headers (e.g. conditional-request validators) may be passed in.
+    With stream=True the body is left unread for iter_content().
+    """
+    params = {
+        'season': season,
+        'map': map,
+        'year': str(year),
+        'submit': 'View Data'
+    }
     # Construct the URL with query parameters
-    response = requests.get(base_url, params=params)
-    
+    return session.get(base_url, params=params, headers=request_headers, stream=stream)
+
+
+def _index_value(text):
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def parse_querylist(html, min_index=None):
+    """
+    Extracts the sighting rows from a querylist page.
+
+    Returns a list of rows (one list of cell values per sighting), or None if
+    the page has no querylist table. With min_index, the rows (listed newest
+    first) are only extracted until one with an Index of min_index or lower
+    is reached.
+    """
+    # Parse the HTML content using BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Find the table element by its ID
+    table = soup.find('table', {'id': 'querylist'})
+
+    # Ensure the table exists
+    if not table:
+        return None
+
+    # Extract rows from the table body to skip the header row
+    tbody = table.find('tbody')
+    rows = tbody.find_all('tr') if tbody else []
+
+    parsed_rows = []
+
+    # Loop through each row and extract the cells (columns)
+    for row in rows:
+        # Extract cells from the row
+        cells = row.find_all('td')
+
+        # Skip rows without the expected number of cells
+        if len(cells) != 8:
+            continue
+
+        # Process each cell
+        row_data = []
+
+        # Index
+        index_text = cells[0].get_text(strip=True)
+        if min_index is not None:
+            index_value = _index_value(index_text)
+            if index_value is not None and index_value <= min_index:
+                break
+        row_data.append(index_text)
+
+        # Date
+        date_link = cells[1].find('a')
+        date_text = date_link.get_text(strip=True) if date_link else cells[1].get_text(strip=True)
+        row_data.append(date_text)
+
+        # Town
+        town_text = cells[2].get_text(strip=True)
+        row_data.append(town_text)
+
+        # State/Province
+        state_text = cells[3].get_text(strip=True)
+        row_data.append(state_text)
+
+        # Latitude
+        lat_text = cells[4].get_text(strip=True)
+        row_data.append(lat_text)
+
+        # Longitude
+        lon_text = cells[5].get_text(strip=True)
+        row_data.append(lon_text)
+
+        # Number
+        number_text = cells[6].get_text(strip=True)
+        row_data.append(number_text)
+
+        # Image
+        image_cell = cells[7]
+        img_tag = image_cell.find('img')
+        if img_tag:
+            img_src = img_tag.get('src', '')
+            # Check if image is a spacer or meaningful
+            if 'spacer.gif' in img_src:
+                image_value = 0
+            else:
+                image_value = 1
+        else:
+            image_value = 0  # No image tag
+        row_data.append(image_value)
+
+        parsed_rows.append(row_data)
+
+    return parsed_rows
+
+
+def _cell_text(cell):
+    """
+    Returns the text of an lxml element the way BeautifulSoup's
+    get_text(strip=True) does: every text fragment stripped, empty fragments
+    dropped, the rest joined without a separator. Comments, scripts and
+    styles contribute no text.
+    """
+    fragments = []
+
+    def walk(element):
+        if isinstance(element.tag, str) and element.tag not in ('script', 'style'):
+            if element.text:
+                fragments.append(element.text)
+            for child in element:
+                walk(child)
+                if child.tail:
+                    fragments.append(child.tail)
+        else:
+            for child in element:
+                if child.tail:
+                    fragments.append(child.tail)
+
+    walk(cell)
+    return ''.join(text.strip() for text in fragments if text.strip())
+
+
+def _lxml_row(row):
+    """
+    Extracts the cell values of one lxml <tr>, or None if it does not have 8 cells.
+    """
+    cells = row.findall('.//td')
+    if len(cells) != 8:
+        return None
+
+    row_data = [_cell_text(cells[0])]
+
+    # Date (prefer the link text when there is one)
+    date_link = cells[1].find('.//a')
+    row_data.append(_cell_text(date_link if date_link is not None else cells[1]))
+
+    # Town, State/Province, Latitude, Longitude, Number
+    row_data.extend(_cell_text(cell) for cell in cells[2:7])
+
+    # Image (spacer.gif or no image at all means no photo)
+    img_tag = cells[7].find('.//img')
+    if img_tag is not None:
+        image_value = 0 if 'spacer.gif' in img_tag.get('src', '') else 1
+    else:
+        image_value = 0
+    row_data.append(image_value)
+    return row_data
+
+
+def parse_querylist_lxml(html, min_index=None):
+    """
+    Extracts the sighting rows from a querylist page using lxml.
+
+    Only the <tbody> of <table id="querylist"> is walked. For pages whose
+    cells are closed properly (as Journey North's are) the rows are identical
+    to the ones parse_querylist returns, including the spacer.gif -> Image 0/1
+    rule. html.parser nests unclosed <td> tags while lxml closes them, so the
+    two can differ on broken markup. min_index works as in parse_querylist.
+    """
+    if lxml_html is None:
+        raise ImportError("The 'lxml' parser backend requires the lxml package.")
+
+    if not html.strip():
+        return None
+    document = lxml_html.document_fromstring(html)
+
+    # Find the table element by its ID
+    tables = document.xpath('//table[@id="querylist"]')
+    if not tables:
+        return None
+
+    # Extract rows from the table body to skip the header row
+    tbody = tables[0].find('.//tbody')
+    rows = tbody.iterfind('.//tr') if tbody is not None else []
+
+    parsed_rows = []
+    for row in rows:
+        row_data = _lxml_row(row)
+
+        # Skip rows without the expected number of cells
+        if row_data is None:
+            continue
+
+        if min_index is not None:
+            index_value = _index_value(row_data[0])
+            if index_value is not None and index_value <= min_index:
+                break
+
+        parsed_rows.append(row_data)
+
+    return parsed_rows
+
+
+class QuerylistStreamParser:
+    """
+    Incremental querylist extractor for the streaming fetch path.
+
+    Bytes are fed as they arrive; every <tr> of the querylist <tbody> is
+    turned into a row as soon as it closes and is then dropped from the lxml
+    tree, so memory stays flat however long the page is. 'done' becomes true
+    once the table body has ended (or, with min_index, once an already
+    stored row is reached) and the rest of the body need not be read.
+    Rows match parse_querylist_lxml.
+    """
+
+    def __init__(self, encoding=None, min_index=None):
+        if etree is None:
+            raise ImportError("Streaming requires the lxml package.")
+        self.parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+        self.min_index = min_index
+        self.table = None
+        self.tbody = None
+        self.done = False
+
+    @property
+    def found_table(self):
+        return self.table is not None
+
+    def feed(self, chunk):
+        """
+        Feeds a chunk of the body and returns the rows completed by it.
+        """
+        self.parser.feed(chunk)
+        return self._rows()
+
+    def close(self):
+        """
+        Ends the body and returns the rows completed by its last bytes.
+        """
+        try:
+            self.parser.close()
+        except etree.XMLSyntaxError:
+            pass  # Empty or truncated documents simply have no rows
+        return self._rows()
+
+    def _rows(self):
+        rows = []
+        for event, element in self.parser.read_events():
+            if self.done:
+                continue
+            tag = element.tag
+            if event == 'start':
+                if tag == 'table' and self.table is None and element.get('id') == 'querylist':
+                    self.table = element
+                elif tag == 'tbody' and self.table is not None and self.tbody is None:
+                    self.tbody = element
+                continue
+
+            if element is self.tbody or (element is self.table and self.tbody is None):
+                self.done = True
+            elif self.tbody is not None and tag == 'tr':
+                row_data = _lxml_row(element)
+                if row_data is not None:
+                    if self.min_index is not None:
+                        index_value = _index_value(row_data[0])
+                        if index_value is not None and index_value <= self.min_index:
+                            self.done = True
+                            continue
+                    rows.append(row_data)
+                # Drop finished rows (and everything before them) from the tree
+                if element.getparent() is self.tbody:
+                    element.clear(keep_tail=True)
+                    while element.getprevious() is not None:
+                        del self.tbody[0]
+        return rows
+
+
+# Available HTML parser backends, selectable with --parser
+parsers = {
+    'html.parser': parse_querylist,
+    'lxml': parse_querylist_lxml,
+}
+
+
+def write_year_csv(filename, rows):
+    """
+    Writes the parsed rows of one year to a CSV file, headers first.
+    """
+    # Open a CSV file to save the data
+    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        csvwriter = csv.writer(csvfile)
+
+        # Write headers to the CSV file
+        csvwriter.writerow(headers)
+
+        # Write the extracted row data to the CSV file
+        csvwriter.writerows(rows)
+
+
+def high_water_mark_path(filename):
+    """
+    Returns the path of the sidecar file remembering the highest Index stored in a yearly CSV.
+    """
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, f'.{name}.hwm')
+
+
+def store_high_water_mark(filename, index):
+    """
+    Records the highest stored Index of a yearly CSV together with the file
+    size it corresponds to, replacing the sidecar atomically.
+    """
+    path = high_water_mark_path(filename)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'index': index, 'size': os.path.getsize(filename)}, f)
+    os.replace(tmp_path, path)
+
+
+def max_index(rows):
+    """
+    Returns the highest numeric Index of the given rows, or None.
+    """
+    values = [value for value in (_index_value(str(row[0])) for row in rows) if value is not None]
+    return max(values) if values else None
+
+
+def load_high_water_mark(filename):
+    """
+    Returns the highest Index already stored in a yearly CSV, or None if the file does not exist.
+
+    An append that was interrupted before its sidecar was updated leaves the
+    file longer than the recorded size; those uncommitted bytes are truncated
+    so the rows are fetched and appended again. Without a usable sidecar the
+    file is scanned once.
+    """
+    if not os.path.isfile(filename):
+        return None
+    try:
+        with open(high_water_mark_path(filename), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = None
+
+    if state is not None:
+        size = os.path.getsize(filename)
+        if size > state['size']:
+            with open(filename, 'r+b') as f:
+                f.truncate(state['size'])
+            print(f"Rolled back an interrupted append to {filename}")
+            return state['index']
+        if size == state['size']:
+            return state['index']
+
+    # Scan the file once and remember the result
+    with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
+        csvreader = csv.reader(csvfile)
+        next(csvreader, None)
+        index = max_index(list(csvreader))
+    if index is not None:
+        store_high_water_mark(filename, index)
+    return index
+
+
+def append_year_csv(filename, rows):
+    """
+    Appends rows to an existing yearly CSV in a single write and records the new high-water mark.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    with open(filename, 'a', newline='', encoding='utf-8') as csvfile:
+        csvfile.write(buffer.getvalue())
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+    store_high_water_mark(filename, max_index(rows))
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces requests so that no more than 'rate'
+    requests per second are started across all workers.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def write_full_year(filename, map, year, rows, output_format='csv', dataset_dir=default_dataset_dir, incremental=False):
+    """
+    Replaces the whole output of one map/year with the given rows.
+
+    For CSV output the Index high-water mark is recorded in incremental mode,
+    and any stale one is removed otherwise.
+    """
+    if output_format == 'parquet':
+        write_partition(dataset_dir, map, year, rows)
+    else:
+        write_year_csv(filename, rows)
+        if incremental:
+            store_high_water_mark(filename, max_index(rows))
+        elif os.path.isfile(high_water_mark_path(filename)):
+            os.remove(high_water_mark_path(filename))
+
+
+def fetch_with_retries(session, map, season, year, request_headers=None, limiter=None, controller=None, retries=0,
+                       stream=False):
+    """
+    Fetches one year, retrying connection errors, 429 and 5xx responses with
+    jittered exponential backoff (or the server's Retry-After, if given).
+
+    Each attempt waits for the rate limiter and, when adaptive concurrency is
+    on, for a slot of the controller, then reports its latency and outcome
+    back to the controller.
+
+    Returns the last response, or None if every attempt raised an error.
+    """
+    response = None
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.wait()
+        if controller is not None:
+            controller.acquire()
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = fetch_year(session, map, season, year, request_headers, stream)
+            ok = response.status_code not in retryable_status_codes
+        except requests.RequestException as e:
+            print(f"Request for {map} {year} failed: {e}")
+            response = None
+        finally:
+            if controller is not None:
+                controller.release(time.perf_counter() - started, ok)
+
+        if ok or attempt == retries:
+            return response
+
+        if response is not None:
+            response.close()
+        delay = backoff_delay(attempt)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        print(f"Retrying {map} {year} in {delay:.1f}s (attempt {attempt + 2}/{retries + 1})...")
+        time.sleep(delay)
+    return response
+
+
+def stream_year(response, filename, map, season, year, cache=None, entry=None, incremental=False,
+                chunk_size=64 * 1024):
+    """
+    Streams one year's body into its CSV with bounded memory.
+
+    The body is read with iter_content() and fed to a QuerylistStreamParser;
+    each row is written as soon as its <tr> closes. A full write goes to a
+    temporary file that replaces the CSV at the end. In incremental mode only
+    rows above the Index high-water mark are kept, and reading stops as soon
+    as an older row is reached.
+
+    Returns a tuple (status, filename) like scrape_year.
+    """
+    high_water_mark = load_high_water_mark(filename) if incremental else None
+    appending = high_water_mark is not None
+    stream_parser = QuerylistStreamParser(encoding=response.encoding, min_index=high_water_mark)
+    hasher = hashlib.sha256()
+    complete = True
+    n_rows = 0
+    new_rows = []
+
+    directory, name = os.path.split(filename)
+    os.makedirs(directory or '.', exist_ok=True)
+    tmp_path = os.path.join(directory, f'.{name}.tmp')
+    csvfile = None
+    if not appending:
+        csvfile = open(tmp_path, 'w', newline='', encoding='utf-8')
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(headers)
+
+    try:
+        chunks = response.iter_content(chunk_size)
+        for chunk in chunks:
+            hasher.update(chunk)
+            rows = stream_parser.feed(chunk)
+            if appending:
+                new_rows.extend(rows)
+            else:
+                csvwriter.writerows(rows)
+            n_rows += len(rows)
+            if stream_parser.done:
+                break
+        else:
+            rows = stream_parser.close()
+            if appending:
+                new_rows.extend(rows)
+            else:
+                csvwriter.writerows(rows)
+            n_rows += len(rows)
+
+        if stream_parser.done:
+            if cache is not None and not appending:
+                # Finish the body hash without parsing the page footer
+                for chunk in chunks:
+                    hasher.update(chunk)
+            else:
+                complete = False
+    finally:
+        response.close()
+        if csvfile is not None:
+            csvfile.close()
+
+    digest = hasher.hexdigest() if complete else None
+
+    if not stream_parser.found_table:
+        if csvfile is not None:
+            os.remove(tmp_path)
+        print(f"No data table found for {map} {year}.")
+        return 'missing', filename
+
+    if appending:
+        if cache is not None:
+            cache.put(map, season, year, response, digest)
+        if not new_rows:
+            print(f"No new rows for {map} {year}.")
+            return 'unchanged', filename
+        append_year_csv(filename, new_rows)
+        print(f"Appended {len(new_rows)} new rows for {map} {year} to {filename}")
+        return 'appended', filename
+
+    if cache is not None and entry and digest is not None and entry.get('sha256') == digest:
+        os.remove(tmp_path)
+        cache.put(map, season, year, response, digest)
+        print(f"Data for {map} {year} is unchanged (same content).")
+        return 'unchanged', filename
+
+    os.replace(tmp_path, filename)
+    if incremental:
+        load_high_water_mark(filename)
+    elif os.path.isfile(high_water_mark_path(filename)):
+        os.remove(high_water_mark_path(filename))
+    if cache is not None:
+        cache.put(map, season, year, response, digest)
+    print(f"Streamed {n_rows} rows for {map} {year} to {filename}")
+    return 'written', filename
+
+
+def scrape_year(session, map, season, year, parse, output_dir='.', parse_pool=None, cache=None, limiter=None,
+                output_format='csv', dataset_dir=default_dataset_dir, incremental=False, controller=None, retries=0,
+                archive=None, stream=False):
+    """
+    Fetches, parses and writes one year of one map/season.
+
+    With output_format 'csv' the rows go to '{output_dir}/{map}_{year}.csv';
+    with 'parquet' they become the map/year partition of the typed Parquet
+    dataset under dataset_dir.
+
+    In incremental mode the highest Index already stored for the map/year is
+    used as a high-water mark: only newer rows are extracted and they are
+    appended to the existing output instead of rewriting it. A year with no
+    newer rows is reported 'unchanged'.
+
+    With a PageArchive, every page fetched successfully is archived so the
+    output can later be rebuilt with reparse(). Pages not archived yet are
+    requested without conditional headers, so a cached year is still archived.
+
+    With stream=True (CSV output only) the body is parsed while it downloads
+    and rows are written as they complete; see stream_year().
+
+    Returns a tuple (status, filename) where status is one of 'written',
+    'appended', 'unchanged', 'failed' or 'missing' (no querylist table on the page).
+    """
+    print(f"Scraping {map} data for year {year}...")
+    if output_format == 'parquet':
+        filename = partition_path(dataset_dir, map, year)
+    else:
+        filename = os.path.join(output_dir, f'{map}_{year}.csv')
+    entry = cache.get(map, season, year) if cache is not None else None
+    if entry and not os.path.isfile(filename):
+        entry = None  # Output is gone, so fetch and write it again
+    request_headers = cache.conditional_headers(entry) if cache is not None else None
+    if archive is not None and archive.ref(map, season, year) is None:
+        request_headers = None  # A 304 would leave nothing to archive, so fetch the page in full
+    response = fetch_with_retries(
+        session, map, season, year, request_headers, limiter=limiter, controller=controller, retries=retries,
+        stream=stream
+    )
+    if response is None:
+        print(f"Failed to retrieve {map} data for year {year}.")
+        return 'failed', filename
+
+    # Nothing changed on the server since the cached response
+    if response.status_code == 304 and entry:
+        response.close()
+        print(f"Data for {map} {year} is unchanged (not modified).")
+        return 'unchanged', filename
+
     # Check if the request was successful
-    if response.status_code == 200:
-        # Parse the HTML content using BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Find the table element by its ID
-        table = soup.find('table', {'id': 'querylist'})
-
-        # Ensure the table exists
-        if table:
-            # Extract rows from the table body to skip the header row
-            tbody = table.find('tbody')
-            rows = tbody.find_all('tr') if tbody else []
-
-            # Open a CSV file to save the data
-            filename = f'{map}_{year}.csv'
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                csvwriter = csv.writer(csvfile)
-
-                # Write headers to the CSV file
-                headers = ["Index", "Date", "Town", "State/Province", "Latitude", "Longitude", "Number", "Image"]
-                csvwriter.writerow(headers)
-
-                # Loop through each row and extract the cells (columns)
-                for row in rows:
-                    # Extract cells from the row
-                    cells = row.find_all('td')
-
-                    # Skip rows without the expected number of cells
-                    if len(cells) != 8:
-                        continue
-
-                    # Process each cell
-                    row_data = []
-
-                    # Index
-                    index_text = cells[0].get_text(strip=True)
-                    row_data.append(index_text)
-
-                    # Date
-                    date_link = cells[1].find('a')
-                    date_text = date_link.get_text(strip=True) if date_link else cells[1].get_text(strip=True)
-                    row_data.append(date_text)
-
-                    # Town
-                    town_text = cells[2].get_text(strip=True)
-                    row_data.append(town_text)
-
-                    # State/Province
-                    state_text = cells[3].get_text(strip=True)
-                    row_data.append(state_text)
-
-                    # Latitude
-                    lat_text = cells[4].get_text(strip=True)
-                    row_data.append(lat_text)
-
-                    # Longitude
-                    lon_text = cells[5].get_text(strip=True)
-                    row_data.append(lon_text)
-
-                    # Number
-                    number_text = cells[6].get_text(strip=True)
-                    row_data.append(number_text)
-
-                    # Image
-                    image_cell = cells[7]
-                    img_tag = image_cell.find('img')
-                    if img_tag:
-                        img_src = img_tag.get('src', '')
-                        # Check if image is a spacer or meaningful
-                        if 'spacer.gif' in img_src:
-                            image_value = 0
-                        else:
-                            image_value = 1
-                    else:
-                        image_value = 0  # No image tag
-                    row_data.append(image_value)
-
-                    # Write the extracted row data to the CSV file
-                    csvwriter.writerow(row_data)
-
-            print(f"Data for year {year} has been written to {filename}")
+    if response.status_code != 200:
+        response.close()
+        print(f"Failed to retrieve {map} data for year {year}. Status code: {response.status_code}")
+        return 'failed', filename
+
+    if stream:
+        return stream_year(response, filename, map, season, year, cache=cache, entry=entry, incremental=incremental)
+
+    if archive is not None:
+        archive.store(map, season, year, response.content, response.encoding, output_dir)
+
+    digest = None
+    if cache is not None:
+        digest = body_hash(response.content)
+        if entry and entry.get('sha256') == digest:
+            cache.put(map, season, year, response, digest)
+            print(f"Data for {map} {year} is unchanged (same content).")
+            return 'unchanged', filename
+
+    high_water_mark = None
+    if incremental:
+        if output_format == 'parquet':
+            high_water_mark = partition_high_water_mark(dataset_dir, map, year)
         else:
-            print(f"No data table found for year {year}.")
+            high_water_mark = load_high_water_mark(filename)
+
+    if parse_pool is not None:
+        rows = parse_pool.submit(parse, response.text, high_water_mark).result()
     else:
-        print(f"Failed to retrieve data for year {year}. Status code: {response.status_code}")
+        rows = parse(response.text, high_water_mark)
+
+    if rows is None:
+        print(f"No data table found for {map} {year}.")
+        return 'missing', filename
+
+    if high_water_mark is not None:
+        if cache is not None:
+            cache.put(map, season, year, response, digest)
+        if not rows:
+            print(f"No new rows for {map} {year}.")
+            return 'unchanged', filename
+        if output_format == 'parquet':
+            filename = append_partition(dataset_dir, map, year, rows)
+        else:
+            append_year_csv(filename, rows)
+        print(f"Appended {len(rows)} new rows for {map} {year} to {filename}")
+        return 'appended', filename
+
+    write_full_year(filename, map, year, rows, output_format, dataset_dir, incremental)
+    if cache is not None:
+        cache.put(map, season, year, response, digest)
+    print(f"Data for {map} {year} has been written to {filename}")
+    return 'written', filename
+
+
+def run_jobs(jobs, workers=1, parse_workers=0, session=None, cache=None, parser='html.parser', rate=None,
+             output_format='csv', dataset_dir=default_dataset_dir, incremental=False,
+             adaptive=False, retries=0, retry_queue=None, archive=None, stream=False):
+    """
+    Scrapes several (map, season, years) jobs over one shared worker pool.
+
+    Every year of every job is queued on the same pool of 'workers' fetch
+    threads and one keep-alive session, so the whole corpus refreshes in a
+    single run. An optional global rate limit caps requests per second across
+    all jobs.
+
+    Parameters:
+    - jobs (list of dict): Each with 'map', 'season', 'years' and optionally 'output_dir'.
+    - workers (int): Number of concurrent fetches.
+    - parse_workers (int): Number of parser processes (0 parses on the fetch threads).
+    - session (requests.Session): Optional session to reuse.
+    - cache (ResponseCache): Optional response cache for conditional requests.
+    - parser (str): HTML parser backend, a key of 'parsers'.
+    - rate (float): Maximum requests per second over all jobs (None for no limit).
+    - output_format (str): 'csv' for one CSV per year, 'parquet' for the partitioned dataset.
+    - dataset_dir (str): Root of the Parquet dataset.
+    - incremental (bool): Append only rows newer than the stored Index high-water mark.
+    - adaptive (bool): Let an AIMD controller vary the requests in flight up to 'workers'.
+    - retries (int): Extra attempts per year for connection errors, 429 and 5xx responses.
+    - retry_queue (RetryQueue): Persistent queue that records years still failing
+      after all retries and forgets years that succeed.
+    - archive (PageArchive): Optional archive of every fetched page.
+    - stream (bool): Parse each body while it downloads, writing rows as they complete.
+
+    Returns a manifest dict with per-job outputs, statuses and timings.
+    """
+    if stream and (output_format != 'csv' or archive is not None):
+        raise ValueError('Streaming writes CSV output only and cannot archive pages.')
+    parse = parsers[parser]
+    session = session or make_session(workers)
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    limiter = RateLimiter(rate) if rate else None
+    controller = AdaptiveController(initial=min(2, workers), max_limit=workers) if adaptive else None
+    started = time.perf_counter()
+
+    job_entries = []
+    for job in jobs:
+        output_dir = job.get('output_dir', '.')
+        if output_format == 'csv':
+            os.makedirs(output_dir, exist_ok=True)
+        job_entries.append({
+            'map': job['map'],
+            'season': job['season'],
+            'output_dir': output_dir,
+            'years': {},
+            'started': None,
+            'finished': None,
+        })
+
+    def handle(entry, year):
+        year_started = time.perf_counter()
+        status, filename = scrape_year(
+            session, entry['map'], entry['season'], year, parse,
+            output_dir=entry['output_dir'], parse_pool=parse_pool, cache=cache, limiter=limiter,
+            output_format=output_format, dataset_dir=dataset_dir, incremental=incremental,
+            controller=controller, retries=retries, archive=archive, stream=stream
+        )
+        if retry_queue is not None:
+            if status == 'failed':
+                retry_queue.add(entry['map'], entry['season'], year, entry['output_dir'], status)
+            else:
+                retry_queue.remove(entry['map'], entry['season'], year)
+        year_finished = time.perf_counter()
+        return entry, year, {
+            'status': status,
+            'file': filename,
+            'seconds': round(year_finished - year_started, 4),
+        }, year_started, year_finished
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [
+                pool.submit(handle, entry, year)
+                for job, entry in zip(jobs, job_entries)
+                for year in job['years']
+            ]
+            for future in as_completed(futures):
+                entry, year, result, year_started, year_finished = future.result()
+                entry['years'][str(year)] = result
+                entry['started'] = min(entry['started'] or year_started, year_started)
+                entry['finished'] = max(entry['finished'] or year_finished, year_finished)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        if retry_queue is not None:
+            retry_queue.save()
+
+    elapsed = time.perf_counter() - started
+    totals = {'written': 0, 'appended': 0, 'unchanged': 0, 'failed': 0, 'missing': 0}
+    for entry in job_entries:
+        statuses = [result['status'] for result in entry['years'].values()]
+        for status in statuses:
+            totals[status] += 1
+        # Wall-clock span of the job inside the shared run, and the summed per-year time
+        entry['elapsed'] = round(entry['finished'] - entry['started'], 4) if entry['started'] is not None else 0.0
+        entry['busy_seconds'] = round(sum(result['seconds'] for result in entry['years'].values()), 4)
+        entry['outputs'] = sorted(
+            result['file'] for result in entry['years'].values() if result['status'] in ('written', 'appended', 'unchanged')
+        )
+        del entry['started'], entry['finished']
+
+    pages = totals['written'] + totals['appended'] + totals['unchanged']
+    requested = sum(totals.values())
+    rate_achieved = pages / elapsed if elapsed > 0 else 0.0
+    print(f"Scraped {totals['written']}/{requested} pages ({totals['appended']} appended, {totals['unchanged']} unchanged) "
+          f"in {elapsed:.2f}s ({rate_achieved:.2f} pages/sec)")
+    if controller is not None:
+        print(f"Adaptive concurrency: {controller.summary()}")
+    if retry_queue is not None and retry_queue.entries:
+        print(f"{len(retry_queue.entries)} years are queued for retry in {retry_queue.path}")
+    return {'elapsed': round(elapsed, 4), 'totals': totals, 'jobs': job_entries}
+
+
+def _reparse_one(task):
+    """
+    Rebuilds the output of one archived page (runs in a reparse worker process).
+    """
+    archive_dir, ref, parser, output_dir, output_format, dataset_dir = task
+    map, year = ref['map'], ref['year']
+    archive = PageArchive(archive_dir)
+    rows = parsers[parser](archive.load(ref))
+    if rows is None:
+        return map, year, 'missing', 0
+    if output_format == 'parquet':
+        filename = partition_path(dataset_dir, map, year)
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        filename = os.path.join(output_dir, f'{map}_{year}.csv')
+    write_full_year(filename, map, year, rows, output_format, dataset_dir)
+    return map, year, 'written', len(rows)
+
+
+def reparse(archive, jobs=None, parser='html.parser', workers=None, output_dir=None,
+            output_format='csv', dataset_dir=default_dataset_dir):
+    """
+    Rebuilds yearly outputs from the page archive on a pool of processes,
+    without any network access.
+
+    Parameters:
+    - archive (PageArchive): Archive to read pages from.
+    - jobs (list of dict): Jobs to rebuild (None rebuilds every archived page).
+    - parser (str): HTML parser backend, a key of 'parsers'.
+    - workers (int): Number of parser processes (None uses every core).
+    - output_dir (str): Directory for the CSV files; defaults to the job's
+      output_dir, or the one recorded when the page was archived.
+    - output_format (str): 'csv' or 'parquet'.
+    - dataset_dir (str): Root of the Parquet dataset.
+
+    Returns a dict with the number of pages and rows rebuilt and the elapsed time.
+    """
+    started = time.perf_counter()
+    tasks = []
+    if jobs:
+        for job in jobs:
+            for year in job['years']:
+                ref = archive.ref(job['map'], job['season'], year)
+                if ref is None:
+                    print(f"No archived page for {job['map']} {year}.")
+                    continue
+                target_dir = output_dir or job.get('output_dir', '.')
+                tasks.append((archive.archive_dir, ref, parser, target_dir, output_format, dataset_dir))
+    else:
+        for ref in archive.refs():
+            target_dir = output_dir or ref.get('output_dir') or '.'
+            tasks.append((archive.archive_dir, ref, parser, target_dir, output_format, dataset_dir))
+
+    pages = 0
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for map, year, status, n_rows in pool.map(_reparse_one, tasks, chunksize=4):
+            if status == 'missing':
+                print(f"No data table found in the archived page for {map} {year}.")
+                continue
+            pages += 1
+            total_rows += n_rows
+
+    elapsed = time.perf_counter() - started
+    print(f"Reparsed {pages}/{len(tasks)} archived pages ({total_rows} rows) in {elapsed:.2f}s")
+    return {'pages': pages, 'rows': total_rows, 'elapsed': elapsed}
+
+
+def parse_job(spec):
+    """
+    Parses a job given on the command line as 'map:season:start-end[:output_dir]'.
+    """
+    parts = spec.split(':', 3)
+    if len(parts) < 3:
+        raise argparse.ArgumentTypeError(f"Invalid job '{spec}', expected map:season:start-end[:output_dir].")
+    map, season, year_range = parts[:3]
+    first, _, last = year_range.partition('-')
+    try:
+        first = int(first)
+        last = int(last or first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid year range '{year_range}' in job '{spec}'.")
+    step = -1 if first >= last else 1
+    job = {'map': map, 'season': season, 'years': list(range(first, last + step, step))}
+    if len(parts) == 4:
+        job['output_dir'] = parts[3]
+    return job
+
+
+def load_jobs(jobs_file):
+    """
+    Loads jobs from a JSON file holding a list of objects with 'map', 'season',
+    'start_year', 'end_year' and optionally 'output_dir'.
+    """
+    with open(jobs_file, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    jobs = []
+    for spec in specs:
+        first = int(spec.get('start_year', start_year))
+        last = int(spec.get('end_year', end_year))
+        step = -1 if first >= last else 1
+        job = {'map': spec['map'], 'season': spec['season'], 'years': list(range(first, last + step, step))}
+        if 'output_dir' in spec:
+            job['output_dir'] = spec['output_dir']
+        jobs.append(job)
+    return jobs
+
+
+def main():
+    global base_url
+
+    # Initialize the argument parser
+    parser = argparse.ArgumentParser(
+        description='Scrape Journey North sightings into one CSV file per year.'
+    )
+    parser.add_argument('--map', default=default_map, help='Journey North map name.')
+    parser.add_argument('--season', default=default_season, help='Season of the map (spring or fall).')
+    parser.add_argument('--start-year', type=int, default=start_year, help='First (most recent) year to scrape.')
+    parser.add_argument('--end-year', type=int, default=end_year, help='Last (oldest) year to scrape.')
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=1,
+        help='Number of years fetched concurrently over the shared session.'
+    )
+    parser.add_argument(
+        '-p', '--parse-workers',
+        type=int,
+        default=0,
+        help='Number of processes used to parse pages (0 parses on the fetch threads).'
+    )
+    parser.add_argument(
+        '--parser',
+        choices=sorted(parsers),
+        default='html.parser',
+        help='HTML parser backend used to extract the querylist table.'
+    )
+    parser.add_argument(
+        '--job',
+        dest='jobs',
+        action='append',
+        type=parse_job,
+        default=[],
+        help="Scrape a job given as 'map:season:start-end[:output_dir]'. May be repeated."
+    )
+    parser.add_argument(
+        '--jobs-file',
+        help='JSON file listing jobs (map, season, start_year, end_year, output_dir).'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=None,
+        help='Maximum requests per second across all jobs.'
+    )
+    parser.add_argument(
+        '-o', '--output-dir',
+        default='.',
+        help='Directory for the yearly CSV files of the --map/--season run.'
+    )
+    parser.add_argument(
+        '--format',
+        dest='output_format',
+        choices=['csv', 'parquet'],
+        default='csv',
+        help="Write one CSV per year, or typed Parquet partitioned by map and year."
+    )
+    parser.add_argument(
+        '--dataset-dir',
+        default=default_dataset_dir,
+        help='Root of the Parquet dataset when --format parquet is used.'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Append only rows whose Index is above the highest one already stored.'
+    )
+    parser.add_argument(
+        '--adaptive',
+        action='store_true',
+        help='Adjust the requests in flight (up to --workers) to the observed latency and error rate.'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=3,
+        help='Extra attempts per year for connection errors, 429 and 5xx responses.'
+    )
+    parser.add_argument(
+        '--retry-queue',
+        default=default_retry_queue_path,
+        help='JSON file that keeps the years still failing after all retries.'
+    )
+    parser.add_argument(
+        '--retry-failed',
+        action='store_true',
+        help='Scrape the years in the retry queue (alone, unless jobs are given too).'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Parse each page while it downloads and write rows as they complete (CSV only, needs lxml).'
+    )
+    parser.add_argument(
+        '--archive-dir',
+        default=None,
+        help='Archive every fetched page, compressed and content-addressed, in this directory.'
+    )
+    parser.add_argument(
+        '--archive-compression',
+        choices=['gzip', 'zstd'],
+        default='gzip',
+        help='Compression of newly archived pages.'
+    )
+    parser.add_argument(
+        '--reparse',
+        action='store_true',
+        help='Rebuild the outputs from --archive-dir instead of scraping (all archived pages unless jobs are given).'
+    )
+    parser.add_argument(
+        '--manifest',
+        help='Write a JSON manifest of outputs and per-job timings to this path.'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=default_cache_dir,
+        help='Directory of the conditional-request response cache.'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always download and rewrite every year.'
+    )
+
+    parser.add_argument(
+        '--base-url',
+        default=base_url,
+        help='querylist.html URL to scrape (e.g. a local replay server).'
+    )
+
+    # Parse the arguments
+    args = parser.parse_args()
+    base_url = args.base_url
+
+    archive = PageArchive(args.archive_dir, args.archive_compression) if args.archive_dir else None
+    jobs = list(args.jobs)
+    if args.jobs_file:
+        jobs.extend(load_jobs(args.jobs_file))
+
+    if args.reparse:
+        if archive is None:
+            parser.error('--reparse requires --archive-dir.')
+        reparse(
+            archive,
+            jobs=jobs,
+            parser=args.parser,
+            workers=args.parse_workers or None,
+            output_dir=args.output_dir if args.output_dir != '.' else None,
+            output_format=args.output_format,
+            dataset_dir=args.dataset_dir
+        )
+        return
+
+    if args.stream and (args.output_format != 'csv' or archive is not None):
+        parser.error('--stream writes CSV output only and cannot be combined with --archive-dir.')
+
+    retry_queue = RetryQueue(args.retry_queue)
+    if args.retry_failed:
+        queued = retry_queue.jobs()
+        if not jobs and not queued:
+            print(f"No failed years to retry in {args.retry_queue}.")
+            return
+        jobs.extend(queued)
+    if not jobs:
+        # Loop over the years from start_year down to end_year
+        years = range(args.start_year, args.end_year - 1, -1)
+        jobs.append({'map': args.map, 'season': args.season, 'years': list(years), 'output_dir': args.output_dir})
+
+    cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    manifest = run_jobs(
+        jobs,
+        workers=args.workers,
+        parse_workers=args.parse_workers,
+        cache=cache,
+        parser=args.parser,
+        rate=args.rate,
+        output_format=args.output_format,
+        dataset_dir=args.dataset_dir,
+        incremental=args.incremental,
+        adaptive=args.adaptive,
+        retries=args.retries,
+        retry_queue=retry_queue,
+        archive=archive,
+        stream=args.stream
+    )
+
+    if args.manifest:
+        with open(args.manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Manifest written to {args.manifest}")
+
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+from datetime import datetime
+import glob
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for the Parquet output mode
+    pa = None
+
+# Default root of the Parquet sightings dataset
+default_dataset_dir = './sightings_parquet'
+
+# Typed schema of the scraped columns (map and year are partition keys)
+if pa is not None:
+    schema = pa.schema([
+        ('Index', pa.int64()),
+        ('Date', pa.date32()),
+        ('Town', pa.string()),
+        ('State/Province', pa.dictionary(pa.int32(), pa.string())),
+        ('Latitude', pa.float32()),
+        ('Longitude', pa.float32()),
+        ('Number', pa.int64()),
+        ('Image', pa.bool_()),
+    ])
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("The Parquet output mode requires the pyarrow package.")
+
+
+def _to_int(text):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        try:
+            return int(float(text))
+        except (TypeError, ValueError):
+            return None
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_date(text):
+    for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def partition_path(dataset_dir, map, year):
+    """
+    Returns the Parquet file holding one map/year partition of the dataset.
+    """
+    return os.path.join(dataset_dir, f'map={map}', f'year={year}', 'part-0.parquet')
+
+
+def rows_to_table(rows):
+    """
+    Converts scraped rows (the scraper's text cells) into a typed Arrow table.
+
+    Cells that cannot be converted (e.g. an empty Number) become nulls.
+    """
+    _require_pyarrow()
+    columns = list(zip(*rows)) if rows else [()] * 8
+    arrays = [
+        pa.array([_to_int(v) for v in columns[0]], type=pa.int64()),
+        pa.array([_to_date(v) for v in columns[1]], type=pa.date32()),
+        pa.array(list(columns[2]), type=pa.string()),
+        pa.array(list(columns[3]), type=pa.string()).dictionary_encode(),
+        pa.array([_to_float(v) for v in columns[4]], type=pa.float32()),
+        pa.array([_to_float(v) for v in columns[5]], type=pa.float32()),
+        pa.array([_to_int(v) for v in columns[6]], type=pa.int64()),
+        pa.array([bool(int(v)) for v in columns[7]], type=pa.bool_()),
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_table_atomically(table, path):
+    directory, name = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    # Dot-prefixed so dataset readers skip it while it is being written
+    tmp_path = os.path.join(directory, f'.{name}.tmp')
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_partition(dataset_dir, map, year, rows):
+    """
+    Writes the rows of one map/year as a partition of the Parquet dataset,
+    replacing any previous version of that partition (including appended parts).
+
+    Returns the path of the written file.
+    """
+    _require_pyarrow()
+    path = partition_path(dataset_dir, map, year)
+    _write_table_atomically(rows_to_table(rows), path)
+    for part in glob.glob(os.path.join(os.path.dirname(path), 'part-*.parquet')):
+        if part != path:
+            os.remove(part)
+    return path
+
+
+def partition_high_water_mark(dataset_dir, map, year):
+    """
+    Returns the highest Index stored in a map/year partition, or None if the
+    partition does not exist. Only the Parquet footers are read: the Index
+    maximum comes from the row-group statistics.
+    """
+    _require_pyarrow()
+    parts = glob.glob(os.path.join(os.path.dirname(partition_path(dataset_dir, map, year)), 'part-*.parquet'))
+    if not parts:
+        return None
+    highest = None
+    for part in parts:
+        metadata = pq.ParquetFile(part).metadata
+        index_column = metadata.schema.to_arrow_schema().get_field_index('Index')
+        for row_group in range(metadata.num_row_groups):
+            statistics = metadata.row_group(row_group).column(index_column).statistics
+            if statistics is not None and statistics.has_min_max:
+                highest = statistics.max if highest is None else max(highest, statistics.max)
+    return highest
+
+
+def append_partition(dataset_dir, map, year, rows):
+    """
+    Adds new rows to a map/year partition as an extra part file named after
+    their highest Index, written atomically so readers never see half a file.
+
+    Returns the path of the written file.
+    """
+    _require_pyarrow()
+    table = rows_to_table(rows)
+    highest = pa.compute.max(table['Index']).as_py()
+    if highest is None:
+        raise ValueError(f"No rows with an Index to append to the {map} {year} partition.")
+    path = os.path.join(os.path.dirname(partition_path(dataset_dir, map, year)), f'part-{highest}.parquet')
+    _write_table_atomically(table, path)
+    return path
+
+
+def read_sightings(dataset_dir=default_dataset_dir, maps=None, years=None, columns=None):
+    """
+    Reads sightings from the Parquet dataset into a pandas DataFrame.
+
+    Only the requested columns are read, and only the partitions matching
+    the given maps and years are opened.
+
+    Parameters:
+    - dataset_dir (str): Root of the dataset.
+    - maps (list of str): Maps to read (None for all).
+    - years (list of int): Years to read (None for all).
+    - columns (list of str): Columns to read (None for all, including map and year).
+    """
+    _require_pyarrow()
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning='hive')
+    filters = None
+    if maps is not None:
+        filters = ds.field('map').isin(list(maps))
+    if years is not None:
+        year_filter = ds.field('year').isin([int(year) for year in years])
+        filters = year_filter if filters is None else filters & year_filter
+    return dataset.to_table(columns=columns, filter=filters).to_pandas()